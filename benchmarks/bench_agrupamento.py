@@ -0,0 +1,58 @@
+"""Escalonamento do percurso Entidade → Frequência → Estação.
+
+Uso: python benchmarks/bench_agrupamento.py [n_linhas ...]
+
+Compara hierarquia_estacoes (uma ordenação) com as máscaras booleanas por
+estação usadas antes; as máscaras só rodam nos tamanhos pequenos.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from setores.agrupamento import hierarquia_estacoes
+from sintetico import gerar_licenciamento
+
+LIMITE_MASCARAS = 100_000
+
+
+def percorrer_hierarquia(df):
+    n = 0
+    for _, frequencias in hierarquia_estacoes(df):
+        for _, estacoes in frequencias:
+            for _, linhas in estacoes:
+                n += len(linhas)
+    return n
+
+
+def percorrer_mascaras(df):
+    n = 0
+    for _, group_entidade in df.groupby('NomeEntidade'):
+        for _, group_freq in group_entidade.groupby('FreqTxMHz'):
+            for estacao_id in group_freq['NumEstacao'].unique():
+                n += len(group_freq[group_freq['NumEstacao'] == estacao_id])
+    return n
+
+
+def medir(funcao, df):
+    inicio = time.perf_counter()
+    assert funcao(df) == len(df)
+    return time.perf_counter() - inicio
+
+
+def main(tamanhos):
+    print(f"{'linhas':>10} {'hierarquia (s)':>15} {'us/linha':>9} {'máscaras (s)':>13} {'us/linha':>9}")
+    for n in tamanhos:
+        df = gerar_licenciamento(n)
+        df['NomeEntidade'] = df['NomeEntidade'].str.split().str[0].str.upper()
+        t_hier = medir(percorrer_hierarquia, df)
+        linha = f"{n:>10} {t_hier:>15.3f} {t_hier / n * 1e6:>9.2f}"
+        if n <= LIMITE_MASCARAS:
+            t_masc = medir(percorrer_mascaras, df)
+            linha += f" {t_masc:>13.3f} {t_masc / n * 1e6:>9.2f}"
+        print(linha)
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,44 @@
+"""Tamanho e tempo de carga de arquivos KMZ gerados.
+
+Uso: python benchmarks/bench_kmz.py arquivo.kmz [arquivo.kmz ...]
+
+O tempo de carga é o de um parse XML completo do doc.kml, usado como
+aproximação do custo de abertura no Google Earth.
+"""
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+KML_NS = '{http://www.opengis.net/kml/2.2}'
+REPETICOES = 5
+
+
+def medir_kmz(caminho):
+    with zipfile.ZipFile(caminho) as z:
+        doc = z.read('doc.kml')
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        raiz = ET.fromstring(doc)
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        'kmz_bytes': os.path.getsize(caminho),
+        'doc_kml_bytes': len(doc),
+        'estilos': sum(1 for _ in raiz.iter(KML_NS + 'Style')),
+        'placemarks': sum(1 for _ in raiz.iter(KML_NS + 'Placemark')),
+        'parse_s': min(tempos),
+    }
+
+
+def main(caminhos):
+    print(f"{'arquivo':<40} {'kmz (KB)':>9} {'doc.kml (KB)':>13} {'estilos':>8} {'placemarks':>11} {'parse (s)':>10}")
+    for caminho in caminhos:
+        m = medir_kmz(caminho)
+        print(f"{caminho[-40:]:<40} {m['kmz_bytes'] / 1024:>9.0f} {m['doc_kml_bytes'] / 1024:>13.0f} "
+              f"{m['estilos']:>8} {m['placemarks']:>11} {m['parse_s']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
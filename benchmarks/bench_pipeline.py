@@ -0,0 +1,123 @@
+"""Vazão e memória da geração completa por estágio, em tamanhos fixos.
+
+Uso: python benchmarks/bench_pipeline.py [n_linhas ...] [--memoria]
+     [--saida resultados.json] [--comparar anterior.json] [--tolerancia 0.2]
+
+Cada tamanho gera uma exportação sintética (semente fixa, ver sintetico.py)
+e roda processar_arquivo num processo novo, para que o pico de RSS e os
+imports de um tamanho não contaminem o seguinte. --saida grava os
+relatórios de setores.medicao; --comparar confronta com uma execução
+anterior e termina com código 1 se o tempo ou a memória piorarem mais que
+a tolerância.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+TAMANHOS = [10_000, 100_000, 1_000_000]
+TOLERANCIA = 0.2
+MAIORES_ESTAGIOS = 3
+
+
+def _pico_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def executar(csv, memoria):
+    """Roda uma geração e devolve o relatório da medição (no processo atual)."""
+    from setores.medicao import Medicao
+    from setores.motor import processar_arquivo
+
+    with tempfile.TemporaryDirectory() as trabalho, Medicao(memoria=memoria) as medicao:
+        processar_arquivo(csv, kml_continuo=True, diretorio_trabalho=trabalho, medicao=medicao)
+    relatorio = medicao.relatorio()
+    relatorio['rss_pico_mb'] = _pico_rss_mb()
+    return relatorio
+
+
+def medir(n, memoria, diretorio):
+    from sintetico import gerar_licenciamento
+
+    csv = os.path.join(diretorio, f"sintetico_{n}.csv")
+    if not os.path.exists(csv):
+        gerar_licenciamento(n).to_csv(csv, index=False)
+    comando = [sys.executable, os.path.abspath(__file__), '--executar', csv] + (['--memoria'] if memoria else [])
+    saida = subprocess.run(comando, check=True, capture_output=True, text=True, cwd=RAIZ).stdout
+    relatorio = json.loads(saida)
+    relatorio['linhas'] = n
+    relatorio['linhas_por_segundo'] = n / relatorio['total_segundos']
+    return relatorio
+
+
+def comparar(atuais, anteriores, tolerancia):
+    """Linhas de texto das regressões além da tolerância (lista vazia se nenhuma)."""
+    regressoes = []
+    for n, atual in atuais.items():
+        anterior = anteriores.get(n)
+        if anterior is None:
+            continue
+        for metrica in ('total_segundos', 'rss_pico_mb'):
+            if not anterior.get(metrica) or atual.get(metrica) is None:
+                continue
+            razao = atual[metrica] / anterior[metrica]
+            if razao > 1 + tolerancia:
+                regressoes.append(f"{n} linhas: {metrica} {anterior[metrica]:.2f} → {atual[metrica]:.2f} ({razao:.2f}x)")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('tamanhos', nargs='*', type=int, default=TAMANHOS)
+    parser.add_argument('--memoria', action='store_true', help="mede também o pico por estágio (tracemalloc)")
+    parser.add_argument('--saida', help="JSON com os resultados desta execução")
+    parser.add_argument('--comparar', metavar='JSON', help="resultados anteriores, gravados com --saida")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--executar', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.executar:
+        json.dump(executar(args.executar, args.memoria), sys.stdout)
+        return 0
+
+    resultados = {}
+    print(f"{'linhas':>10} {'total (s)':>10} {'linhas/s':>10} {'RSS (MB)':>9}  maiores estágios (tempo próprio)")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for n in args.tamanhos:
+            relatorio = medir(n, args.memoria, diretorio)
+            resultados[str(n)] = relatorio
+            maiores = sorted(relatorio['resumo'], key=lambda e: e['proprio_segundos'], reverse=True)
+            estagios = ", ".join(f"{e['estagio']} {e['proprio_segundos']:.2f}s" for e in maiores[:MAIORES_ESTAGIOS])
+            rss = '-' if relatorio['rss_pico_mb'] is None else f"{relatorio['rss_pico_mb']:.0f}"
+            print(f"{n:>10} {relatorio['total_segundos']:>10.2f} {relatorio['linhas_por_segundo']:>10.0f} "
+                  f"{rss:>9}  {estagios}")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'data': time.strftime('%Y-%m-%dT%H:%M:%S'), 'resultados': resultados}, f,
+                      ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anteriores = json.load(f)['resultados']
+        regressoes = comparar(resultados, anteriores, args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO: {regressao}")
+        if regressoes:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
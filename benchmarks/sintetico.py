@@ -0,0 +1,81 @@
+"""Gerador de exportações sintéticas no esquema de licenciamento da Anatel."""
+import numpy as np
+import pandas as pd
+
+COLUNAS_ANATEL = [
+    'Status.state', 'NomeEntidade', 'NumFistel', 'NumServico', 'NumAto', 'NumEstacao',
+    'EnderecoEstacao', 'EndComplemento', 'SiglaUf', 'CodMunicipio', 'DesignacaoEmissao',
+    'Tecnologia', 'tipoTecnologia', 'meioAcesso', 'FreqTxMHz', 'FreqRxMHz', 'Azimute',
+    'CodTipoClasseEstacao', 'ClassInfraFisica', 'CompartilhamentoInfraFisica', 'CodTipoAntena',
+    'CodEquipamentoAntena', 'GanhoAntena', 'FrenteCostaAntena', 'AnguloMeiaPotenciaAntena',
+    'AnguloElevacao', 'Polarizacao', 'AlturaAntena', 'CodEquipamentoTransmissor',
+    'PotenciaTransmissorWatts', 'Latitude', 'Longitude', 'CodDebitoTFI', 'DataLicenciamento',
+    'DataPrimeiroLicenciamento', 'NumRede', '_id', 'DataValidade', 'NumFistelAssociado',
+    'NomeEntidadeAssociado', 'Municipio.NomeMunicipio',
+]
+
+ENTIDADES = ['CLARO S.A.', 'TELEFONICA BRASIL S.A.', 'TIM S A', 'OI S.A.- EM RECUPERAÇÃO JUDICIAL',
+             'RUMO MALHA SUL S/A', 'RIO GRANDE DO SUL POLICIA CIVIL']
+FREQUENCIAS = [460.0, 763.0, 778.0, 869.0, 881.5, 945.0, 1815.0, 1845.0, 1870.0, 2110.0,
+               2140.0, 2160.0, 2355.0, 2580.0, 2630.0, 2655.0, 3350.0, 3500.0, 4900.0]
+TECNOLOGIAS = ['LTE', 'GSM', 'WCDMA', 'NR']
+UFS = ['AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+       'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO']
+LINHAS_POR_ESTACAO = 6
+
+
+def gerar_licenciamento(n_linhas, seed=0):
+    """DataFrame com n_linhas no esquema completo (41 colunas) da exportação."""
+    rng = np.random.default_rng(seed)
+    n_estacoes = max(1, n_linhas // LINHAS_POR_ESTACAO)
+    estacao = rng.integers(0, n_estacoes, n_linhas)
+    uf = rng.integers(0, len(UFS), n_estacoes)
+    municipio = uf * 100 + rng.integers(0, 20, n_estacoes)
+    lat = rng.uniform(-33.5, 5.0, n_estacoes).round(5)
+    lon = rng.uniform(-73.5, -35.0, n_estacoes).round(5)
+    entidade = rng.integers(0, len(ENTIDADES), n_estacoes)
+    freq = np.asarray(FREQUENCIAS)[rng.integers(0, len(FREQUENCIAS), n_linhas)]
+    df = pd.DataFrame({
+        'Status.state': 'LIC-LIC-01',
+        'NomeEntidade': np.asarray(ENTIDADES)[entidade[estacao]],
+        'NumFistel': 50409146366,
+        'NumServico': 10,
+        'NumAto': rng.integers(10_000_000, 99_999_999, n_linhas),
+        'NumEstacao': 1_000_000 + estacao,
+        'EnderecoEstacao': 'RUA SINTETICA',
+        'EndComplemento': '',
+        'SiglaUf': np.asarray(UFS)[uf[estacao]],
+        'CodMunicipio': 1_000_000 + municipio[estacao],
+        'DesignacaoEmissao': '5M00G9W',
+        'Tecnologia': np.asarray(TECNOLOGIAS)[rng.integers(0, len(TECNOLOGIAS), n_linhas)],
+        'tipoTecnologia': '',
+        'meioAcesso': '',
+        'FreqTxMHz': freq,
+        'FreqRxMHz': freq - 190,
+        'Azimute': rng.choice([0, 30, 60, 120, 130, 240, 250, 360], n_linhas).astype(float),
+        'CodTipoClasseEstacao': 'FB',
+        'ClassInfraFisica': '',
+        'CompartilhamentoInfraFisica': 'NA',
+        'CodTipoAntena': 760,
+        'CodEquipamentoAntena': '002000703518',
+        'GanhoAntena': '16.4',
+        'FrenteCostaAntena': 23,
+        'AnguloMeiaPotenciaAntena': 55,
+        'AnguloElevacao': 0,
+        'Polarizacao': 'X',
+        'AlturaAntena': 30,
+        'CodEquipamentoTransmissor': '013911303257',
+        'PotenciaTransmissorWatts': 40.0,
+        'Latitude': lat[estacao],
+        'Longitude': lon[estacao],
+        'CodDebitoTFI': 'G',
+        'DataLicenciamento': '2023-07-13',
+        'DataPrimeiroLicenciamento': '1999-10-05',
+        'NumRede': '',
+        '_id': [f'{i:013x}' for i in range(n_linhas)],
+        'DataValidade': '2038-04-30',
+        'NumFistelAssociado': '',
+        'NomeEntidadeAssociado': '',
+        'Municipio.NomeMunicipio': 'Municipio ' + pd.Series(municipio[estacao]).astype(str),
+    })
+    return df[COLUNAS_ANATEL]
@@ -0,0 +1,29 @@
+"""Motor de geração de setores de estações (KMZ/GeoJSON).
+
+Os nomes públicos são carregados sob demanda, para que ``import setores``
+não puxe pandas, shapely e simplekml antes de serem usados.
+"""
+import importlib
+
+_EXPORTS = {
+    'processar_arquivo': 'setores.motor',
+    'indexar_arquivo': 'setores.motor',
+    'PERFIS': 'setores.motor',
+    'gerar': 'setores.pipeline',
+    'ler_licenciamento': 'setores.leitura',
+    'particionar': 'setores.lotes',
+    'CacheDisco': 'setores.cache',
+    'Medicao': 'setores.medicao',
+    'IndiceCobertura': 'setores.indice',
+    'calcular_setores': 'setores.geometria',
+    'gerar_circulos': 'setores.geometria',
+    'faixas': 'setores.faixas',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(nome):
+    if nome in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[nome]), nome)
+    raise AttributeError(f"module 'setores' has no attribute {nome!r}")
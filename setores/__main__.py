@@ -0,0 +1,5 @@
+import sys
+
+from setores.cli import main
+
+sys.exit(main())
@@ -0,0 +1,62 @@
+"""Agrupamento Entidade → Frequência → Estação numa única ordenação."""
+import numpy as np
+import pandas as pd
+
+CHAVES_ESTACAO = ['NomeEntidade', 'FreqTxMHz', 'NumEstacao']
+# Frequência que agrupa a estação quando os setores foram coalescidos (ver setores.normalizacao)
+COLUNA_FREQ_ESTACAO = 'FreqEstacao'
+
+
+def chaves_estacao(df):
+    """Chaves de uma estação: por frequência, ou por faixa se os setores foram coalescidos."""
+    if COLUNA_FREQ_ESTACAO in df:
+        return ['NomeEntidade', COLUNA_FREQ_ESTACAO, 'NumEstacao']
+    return CHAVES_ESTACAO
+
+
+def _limites(inicios, fim):
+    return zip(inicios.tolist(), inicios[1:].tolist() + [fim])
+
+
+def hierarquia_estacoes(df):
+    """Percorre as estações na mesma ordem dos groupby aninhados originais.
+
+    Entidades e frequências em ordem crescente, estações por ordem de
+    aparição e linhas na ordem do arquivo. Produz (nome_entidade, frequencias),
+    onde frequencias produz (freq, estacoes) e estacoes é uma lista de
+    (estacao_id, posicoes). Cada nível é só um intervalo da ordenação, sem
+    voltar a varrer o DataFrame.
+    """
+    if df.empty:
+        return
+    codigo_entidade, entidades = pd.factorize(df['NomeEntidade'], sort=True)
+    chaves = chaves_estacao(df)
+    codigo_freq, freqs = pd.factorize(df[chaves[1]], sort=True)
+    codigo_estacao = df.groupby(chaves, sort=False).ngroup().to_numpy()
+    ordem = np.lexsort((codigo_estacao, codigo_freq, codigo_entidade))
+    codigo_entidade = codigo_entidade[ordem]
+    codigo_freq = codigo_freq[ordem]
+    codigo_estacao = codigo_estacao[ordem]
+    estacoes = df['NumEstacao'].to_numpy()[ordem]
+
+    muda_estacao = np.r_[True, codigo_estacao[1:] != codigo_estacao[:-1]]
+    muda_freq = np.r_[True, (codigo_freq[1:] != codigo_freq[:-1]) |
+                      (codigo_entidade[1:] != codigo_entidade[:-1])]
+    muda_entidade = np.r_[True, codigo_entidade[1:] != codigo_entidade[:-1]]
+    inicio_estacao = np.flatnonzero(muda_estacao)
+    inicio_freq = np.flatnonzero(muda_freq)
+    inicio_entidade = np.flatnonzero(muda_entidade)
+    n = len(ordem)
+
+    def _estacoes(a, b):
+        i = np.searchsorted(inicio_estacao, a)
+        j = np.searchsorted(inicio_estacao, b)
+        return [(estacoes[x], ordem[x:y]) for x, y in _limites(inicio_estacao[i:j], b)]
+
+    def _frequencias(a, b):
+        i = np.searchsorted(inicio_freq, a)
+        j = np.searchsorted(inicio_freq, b)
+        return ((freqs[codigo_freq[x]], _estacoes(x, y)) for x, y in _limites(inicio_freq[i:j], b))
+
+    for a, b in _limites(inicio_entidade, n):
+        yield entidades[codigo_entidade[a]], _frequencias(a, b)
@@ -0,0 +1,184 @@
+"""Interface Streamlit de geração, comum a create_kmz.py e streamlit_app.py.
+
+Os dois scripts só diferem no perfil de distância e na distância padrão
+do formulário; chamam executar() com os seus. Exige o extra ``app``.
+"""
+import json
+import os
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+from setores.pipeline import OUTPUT_KMZ
+from setores.saida import ROTULOS
+from setores.tarefas import ATIVAS, CANCELADA, CONCLUIDA, NA_FILA, FilaTarefas
+
+# --- CONFIGURAÇÕES PADRÃO ---
+SETOR_ANGULO = 30
+RAIO_CIRCULO_METROS = 40
+OPACIDADE_PERCENTUAL = 60
+
+# No perfil absoluto a distância vale para todos os setores; no proporcional, é a de referência
+ROTULOS_DISTANCIA = {
+    'absoluto': "Distância do Setor (km)",
+    'proporcional': "Distância padrão do setor (km)",
+}
+
+# --- PROCESSAMENTO ---
+INTERVALO_PROGRESSO = 1  # segundos entre as atualizações do progresso
+
+
+@st.cache_resource
+def fila_tarefas():
+    # Uma fila por servidor: as sessões dividem os mesmos processos de trabalho
+    return FilaTarefas()
+
+
+def sessao():
+    # Identifica a sessão na fila: repetir o envio nela não soma outro interessado
+    return st.session_state.setdefault('sessao', uuid.uuid4().hex)
+
+
+def submit_file(input_file, perfil, distancia_km, setor_angulo, raio_circulo_metros, opacidade_percentual,
+                kml_continuo=False, formato_saida='geojson', tamanho_bloco=None, kml_regionado=False, coalescer=True,
+                medir_memoria=False, cobertura=False):
+    """Envia a geração para a fila em segundo plano e devolve o id da tarefa."""
+    parametros = dict(
+        distancia_km=distancia_km,
+        setor_angulo=setor_angulo,
+        raio_circulo_metros=raio_circulo_metros,
+        opacidade_percentual=opacidade_percentual,
+        kml_continuo=kml_continuo,
+        kml_regionado=kml_regionado,
+        coalescer=coalescer,
+        cobertura=cobertura,
+        formato_saida=formato_saida,
+        tamanho_bloco=tamanho_bloco,
+        perfil=perfil
+    )
+    return fila_tarefas().enviar(input_file, parametros, memoria=medir_memoria, sessao=sessao())
+
+
+@st.fragment(run_every=INTERVALO_PROGRESSO)
+def acompanhar(tarefa):
+    situacao = fila_tarefas().situacao(tarefa['id'])
+    if situacao is None or situacao['estado'] not in ATIVAS:
+        st.rerun()
+    if situacao['estado'] == NA_FILA:
+        st.info(f"Tarefa {tarefa['id']} na fila (posição {situacao['posicao']}).")
+    else:
+        texto = f"Tarefa {tarefa['id']}: {situacao['estagio']}"
+        fracao = 0.0
+        if situacao['total']:
+            texto += f" — {situacao['detalhe']} ({situacao['feito'] + 1}/{situacao['total']})"
+            fracao = situacao['feito'] / situacao['total']
+        st.progress(fracao, text=texto)
+    if st.button("Cancelar"):
+        fila_tarefas().cancelar(tarefa['id'], sessao())
+        del st.session_state['tarefa']
+        st.rerun()
+
+
+def mostrar_resultado(tarefa, situacao):
+    if situacao['estado'] == CANCELADA:
+        st.info(f"Tarefa {tarefa['id']} cancelada.")
+        return
+    if situacao['estado'] != CONCLUIDA:
+        st.error(f"Erro: {situacao['erro']}")
+        return
+    kmz_path, geojson_path, relatorio = situacao['resultado']
+    if not (os.path.exists(kmz_path) and os.path.exists(geojson_path)):
+        st.warning("Os arquivos desta tarefa saíram do cache; gere novamente.")
+        return
+    st.success("Arquivos gerados com sucesso!")
+    with open(kmz_path, "rb") as f:
+        st.download_button("Baixar KMZ", f, file_name=OUTPUT_KMZ)
+    with open(geojson_path, "rb") as f:
+        st.download_button(f"Baixar {ROTULOS[tarefa['formato']]}", f, file_name=os.path.basename(geojson_path))
+    if tarefa['medir']:
+        st.subheader("Medição por estágio")
+        estagios = pd.DataFrame(relatorio['estagios'])
+        estagios['estagio'] = ["· " * nivel + nome for nivel, nome in zip(estagios['nivel'], estagios['estagio'])]
+        st.dataframe(estagios.drop(columns='nivel'), hide_index=True)
+        st.download_button("Baixar relatório de medição (JSON)",
+                           json.dumps(relatorio, ensure_ascii=False, indent=2, default=str),
+                           file_name="medicao.json")
+
+
+# --- INTERFACE STREAMLIT ---
+def _campo_distancia(perfil, distancia_padrao):
+    return st.number_input(ROTULOS_DISTANCIA[perfil], min_value=0.1, max_value=10.0, value=distancia_padrao, step=0.1)
+
+
+def _campo_raio():
+    return st.number_input("Raio do Círculo (m)", min_value=1, max_value=500, value=RAIO_CIRCULO_METROS, step=1)
+
+
+def executar(perfil, distancia_padrao):
+    """Desenha a página; perfil é um de setores.motor.PERFIS e distancia_padrao o valor inicial em km."""
+    st.set_page_config(page_title="Gerador de KMZ e GeoJSON", layout="centered")
+    st.title("Gerador de KMZ e GeoJSON para Setores de Estações")
+    st.markdown("Faça upload de um arquivo CSV ou Excel com as colunas necessárias.")
+
+    with st.form("params_form"):
+        uploaded_file = st.file_uploader("Arquivo de entrada (CSV/Excel)", type=["csv", "xlsx", "xls"])
+        col1, col2 = st.columns(2)
+        with col1:
+            # A distância vem primeiro quando é a do próprio setor
+            if perfil == 'absoluto':
+                distancia_km = _campo_distancia(perfil, distancia_padrao)
+                raio_circulo_metros = _campo_raio()
+            else:
+                raio_circulo_metros = _campo_raio()
+                distancia_km = _campo_distancia(perfil, distancia_padrao)
+        with col2:
+            setor_angulo = st.number_input("Ângulo do Setor (graus)", min_value=1, max_value=180, value=SETOR_ANGULO,
+                                           step=1)
+            opacidade_percentual = st.slider("Opacidade (%)", min_value=0, max_value=100, value=OPACIDADE_PERCENTUAL)
+        kml_continuo = st.checkbox("Gravação contínua do KMZ (baixo uso de memória, troca de opacidade instantânea)",
+                                   value=True)
+        kml_regionado = st.checkbox("KMZ regionalizado (níveis de detalhe para exportações nacionais)", value=False)
+        coalescer = st.checkbox("Juntar linhas repetidas do mesmo setor (entidade, estação, faixa, azimute, tecnologia)",
+                                value=True)
+        cobertura = st.checkbox("Cobertura por entidade e faixa (união dos setores, em pasta e camada à parte)",
+                                value=False)
+        medir = st.checkbox("Medir o tempo de cada estágio (relatório JSON)", value=False)
+        medir_memoria = st.checkbox("Incluir o pico de memória na medição (bem mais lento)", value=False)
+        formato_saida = st.selectbox("Formato das feições", list(ROTULOS), format_func=ROTULOS.get)
+        submitted = st.form_submit_button("Gerar Arquivos")
+
+    if submitted and uploaded_file:
+        anterior = st.session_state.get('tarefa')
+        try:
+            id_tarefa = submit_file(
+                uploaded_file,
+                perfil,
+                distancia_km,
+                setor_angulo,
+                raio_circulo_metros,
+                opacidade_percentual,
+                kml_continuo=kml_continuo,
+                kml_regionado=kml_regionado,
+                coalescer=coalescer,
+                cobertura=cobertura,
+                formato_saida=formato_saida,
+                medir_memoria=medir_memoria
+            )
+            st.session_state['tarefa'] = {'id': id_tarefa, 'formato': formato_saida, 'medir': medir or medir_memoria}
+            if anterior and anterior['id'] != id_tarefa:
+                fila_tarefas().cancelar(anterior['id'], sessao())
+        except Exception as e:
+            st.error(f"Erro: {e}")
+    elif submitted and not uploaded_file:
+        st.warning("Por favor, selecione um arquivo de entrada.")
+
+    tarefa = st.session_state.get('tarefa')
+    if tarefa:
+        situacao = fila_tarefas().situacao(tarefa['id'])
+        if situacao is None:
+            del st.session_state['tarefa']
+        elif situacao['estado'] in ATIVAS:
+            acompanhar(tarefa)
+        else:
+            mostrar_resultado(tarefa, situacao)
@@ -0,0 +1,248 @@
+"""Cache em disco, endereçado por conteúdo, dos resultados e tabelas lidas.
+
+Cada entrada é um diretório cujo nome é o hash da chave. O mtime do
+diretório marca o último acesso; quando o total passa do limite, as
+entradas usadas há mais tempo são removidas (LRU).
+
+O diretório padrão fica no temporário do sistema, mas é de cada usuário:
+criado com modo 0700 e recusado se pertencer a outro ou se outros puderem
+gravar nele. Tabelas vão em Parquet, nunca em pickle.
+
+Dentro de uso(), as entradas lidas ou gravadas ficam fixadas (um arquivo
+com a chave num diretório .uso-<pid>-*) e a limpeza só roda ao sair, sem
+tocar nelas nem nas fixadas por outros processos. Fixar e limpar correm
+sob uma trava de arquivo, então uma entrada obtida não some antes de ser lida.
+"""
+import contextlib
+import getpass
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def diretorio_usuario(nome):
+    """Caminho de nome no diretório temporário, com o usuário atual no sufixo."""
+    usuario = os.getuid() if hasattr(os, 'getuid') else getpass.getuser()
+    return os.path.join(tempfile.gettempdir(), f"{nome}-{usuario}")
+
+
+DIRETORIO_CACHE = os.environ.get("SETORES_CACHE_DIR", diretorio_usuario("setores_cache"))
+LIMITE_CACHE_BYTES = int(float(os.environ.get("SETORES_CACHE_MB", 1024)) * 1024 * 1024)
+ARQUIVO_TABELA = "tabela.parquet"
+TAMANHO_BLOCO_HASH = 1024 * 1024
+PREFIXO_TEMPORARIO = ".tmp-"
+PREFIXO_USO = ".uso-"
+ARQUIVO_TRAVA = ".trava"
+
+
+def hash_arquivo(arquivo):
+    """SHA-256 do conteúdo de um caminho ou objeto de arquivo (volta ao início depois)."""
+    h = hashlib.sha256()
+    if hasattr(arquivo, 'read'):
+        arquivo.seek(0)
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b''):
+            h.update(bloco)
+        arquivo.seek(0)
+    else:
+        with open(arquivo, 'rb') as f:
+            for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+                h.update(bloco)
+    return h.hexdigest()
+
+
+def diretorio_privado(caminho):
+    """Cria caminho com modo 0700 ou confere que o já existente é só do usuário atual."""
+    os.makedirs(caminho, mode=0o700, exist_ok=True)
+    if hasattr(os, 'getuid'):
+        info = os.lstat(caminho)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o022:
+            raise PermissionError(
+                f"{caminho} não é um diretório do usuário atual protegido contra gravação de outros."
+            )
+    return caminho
+
+
+def _processo_vivo(pid):
+    if not hasattr(os, 'getuid'):
+        # No Windows os.kill(pid, 0) encerraria o processo; a fixação é mantida
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _tamanho(caminho):
+    total = 0
+    for raiz, _, arquivos in os.walk(caminho):
+        for nome in arquivos:
+            with contextlib.suppress(OSError):
+                total += os.path.getsize(os.path.join(raiz, nome))
+    return total
+
+
+class CacheDisco:
+    def __init__(self, diretorio=DIRETORIO_CACHE, limite_bytes=LIMITE_CACHE_BYTES):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self._uso = None
+        diretorio_privado(diretorio)
+
+    @staticmethod
+    def chave(*partes):
+        return hashlib.sha256(repr(partes).encode('utf-8')).hexdigest()
+
+    def _entrada(self, chave):
+        return os.path.join(self.diretorio, chave)
+
+    @contextlib.contextmanager
+    def _travado(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.diretorio, ARQUIVO_TRAVA), 'a') as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def _fixar(self, chave):
+        if self._uso is not None:
+            open(os.path.join(self._uso, chave), 'w').close()
+
+    def _fixadas(self):
+        """Chaves fixadas por usos em andamento; remove as de processos que já morreram."""
+        fixadas = set()
+        for nome in os.listdir(self.diretorio):
+            if not nome.startswith(PREFIXO_USO):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            pid = nome[len(PREFIXO_USO):].split('-')[0]
+            if pid.isdigit() and not _processo_vivo(int(pid)):
+                shutil.rmtree(caminho, ignore_errors=True)
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                fixadas.update(os.listdir(caminho))
+        return fixadas
+
+    @contextlib.contextmanager
+    def uso(self):
+        """Fixa as entradas tocadas no bloco; ao sair, limpa só as demais.
+
+        Reentrante: um uso dentro de outro vale pelo de fora.
+        """
+        if self._uso is not None:
+            yield self
+            return
+        self._uso = tempfile.mkdtemp(prefix=f"{PREFIXO_USO}{os.getpid()}-", dir=self.diretorio)
+        try:
+            yield self
+        finally:
+            try:
+                self.limpar()
+            finally:
+                shutil.rmtree(self._uso, ignore_errors=True)
+                self._uso = None
+
+    def obter(self, chave):
+        """Diretório da entrada, ou None; um acerto renova a posição no LRU."""
+        entrada = self._entrada(chave)
+        with self._travado():
+            self._fixar(chave)
+            try:
+                os.utime(entrada)
+            except FileNotFoundError:
+                return None
+        return entrada
+
+    @contextlib.contextmanager
+    def gravar(self, chave):
+        """Entrega um diretório temporário que vira a entrada ao sair sem erro."""
+        temporario = tempfile.mkdtemp(prefix=PREFIXO_TEMPORARIO, dir=self.diretorio)
+        try:
+            yield temporario
+            self._fixar(chave)
+            try:
+                os.rename(temporario, self._entrada(chave))
+            except OSError:
+                # Outra sessão gravou a mesma chave primeiro; o conteúdo é o mesmo
+                shutil.rmtree(temporario, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(temporario, ignore_errors=True)
+            raise
+        self.obter(chave)
+        if self._uso is None:
+            self.limpar(manter={chave})
+
+    def limpar(self, manter=()):
+        """Remove as entradas menos usadas, fora as fixadas e manter, até o total caber no limite."""
+        with self._travado():
+            fixadas = self._fixadas() | set(manter)
+            entradas = []
+            total = 0
+            for nome in os.listdir(self.diretorio):
+                if nome.startswith('.'):
+                    continue
+                caminho = os.path.join(self.diretorio, nome)
+                try:
+                    momento, tamanho = os.path.getmtime(caminho), _tamanho(caminho)
+                except FileNotFoundError:
+                    continue
+                total += tamanho
+                if nome not in fixadas:
+                    entradas.append((momento, tamanho, caminho))
+            for _, tamanho, caminho in sorted(entradas):
+                if total <= self.limite_bytes:
+                    break
+                shutil.rmtree(caminho, ignore_errors=True)
+                total -= tamanho
+
+    def entrada(self, chave, produzir):
+        """Diretório da entrada; se ainda não existe, produzir(diretorio) o preenche.
+
+        Fora de uso(), nada protege a entrada devolvida da limpeza de outro processo.
+        """
+        entrada = self.obter(chave)
+        if entrada is None:
+            with self.gravar(chave) as temporario:
+                produzir(temporario)
+            entrada = self._entrada(chave)
+        return entrada
+
+    def tabela(self, chave, ler):
+        """DataFrame guardado sob a chave, ou o resultado de ler() gravado nela.
+
+        Sem pyarrow não há como gravar o Parquet, e ler() roda sempre.
+        """
+        if pyarrow is None:
+            return ler()
+        with self.uso():
+            entrada = self.obter(chave)
+            if entrada is not None:
+                try:
+                    return pd.read_parquet(os.path.join(entrada, ARQUIVO_TABELA))
+                except FileNotFoundError:
+                    # Entrada de outro formato (ex.: tabela.pkl antigo): sai para dar lugar à nova
+                    shutil.rmtree(entrada, ignore_errors=True)
+            df = ler()
+            with self.gravar(chave) as temporario:
+                df.to_parquet(os.path.join(temporario, ARQUIVO_TABELA))
+            return df
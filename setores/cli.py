@@ -0,0 +1,300 @@
+"""Linha de comando: ``setores build entrada.csv -o saida.kmz``.
+
+Com ``--particionar uf`` a exportação nacional é dividida por UF (ou
+município/entidade) e cada parte é gerada num processo do pool.
+
+As dependências pesadas (pandas, simplekml, shapely) só são importadas
+quando um comando roda, para manter o ``--help`` e o import rápidos.
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+ARQUIVO_NACIONAL = "nacional.kmz"
+EXTENSAO_INDICE = ".indice.npz"
+EXTENSAO_MEDICAO = ".medicao.json"
+# Chaves de setores.lotes.CHAVES_PARTICAO, repetidas aqui para não importar pandas no --help
+PARTICOES = ['entidade', 'municipio', 'uf']
+FORMATOS_POR_EXTENSAO = {'.geojson': 'geojson', '.json': 'geojson', '.fgb': 'fgb', '.parquet': 'parquet',
+                         '.pmtiles': 'pmtiles', '.mbtiles': 'mbtiles'}
+# Parâmetro de processar_arquivo → opção da linha de comando; ausentes usam o padrão do motor
+PARAMETROS = {
+    'distancia_km': 'distancia_km',
+    'setor_angulo': 'angulo',
+    'raio_circulo_metros': 'raio',
+    'opacidade_percentual': 'opacidade',
+}
+
+
+def _formato(caminho, formato):
+    if formato:
+        return formato
+    return FORMATOS_POR_EXTENSAO.get(os.path.splitext(caminho or '')[1].lower(), 'geojson')
+
+
+def construir(entrada, saida_kmz, saida_feicoes, opcoes):
+    """Gera os arquivos de uma entrada e os move para os caminhos pedidos.
+
+    Com opcoes['indice'], grava também o índice espacial ao lado do KMZ, e
+    com opcoes['medicao'], o relatório de tempo e memória por estágio.
+    """
+    from setores.cache import CacheDisco
+    from setores.faixas import carregar_faixas
+    from setores.medicao import Medicao
+    from setores.motor import indexar_arquivo, processar_arquivo
+
+    cache = CacheDisco(opcoes['cache']) if opcoes['cache'] else None
+    parametros = {nome: opcoes[opcao] for nome, opcao in PARAMETROS.items() if opcoes[opcao] is not None}
+    if opcoes['faixas']:
+        parametros['tabela_faixas'] = carregar_faixas(opcoes['faixas'])
+    parametros['coalescer'] = not opcoes['manter_repetidas']
+    parametros['cobertura'] = opcoes['cobertura']
+    saida_indice = os.path.splitext(saida_kmz)[0] + EXTENSAO_INDICE if opcoes['indice'] else None
+    medicao = Medicao(memoria=opcoes['medicao'] == 'memoria') if opcoes['medicao'] else None
+    with tempfile.TemporaryDirectory() as trabalho, medicao or contextlib.nullcontext():
+        if cache is None and saida_indice:
+            # Um cache descartável deixa o índice reaproveitar a tabela e os vértices do KMZ
+            cache = CacheDisco(os.path.join(trabalho, 'cache'))
+        # As saídas ficam fixadas no cache até serem copiadas
+        with cache.uso() if cache is not None else contextlib.nullcontext():
+            kmz, feicoes = processar_arquivo(
+                entrada,
+                kml_continuo=not opcoes['kml_memoria'],
+                kml_regionado=opcoes['regionado'],
+                formato_saida=opcoes['formato'],
+                tamanho_bloco=opcoes['tamanho_bloco'],
+                cache=cache,
+                perfil=opcoes['perfil'],
+                diretorio_trabalho=trabalho,
+                medicao=medicao,
+                **parametros
+            )
+            copias = [(kmz, saida_kmz), (feicoes, saida_feicoes)]
+            if saida_indice:
+                parametros.pop('opacidade_percentual', None)
+                parametros.pop('cobertura')
+                indice = indexar_arquivo(entrada, tamanho_bloco=opcoes['tamanho_bloco'], cache=cache,
+                                         perfil=opcoes['perfil'], diretorio_trabalho=trabalho, medicao=medicao,
+                                         **parametros)
+                copias.append((indice, saida_indice))
+            for origem, destino in copias:
+                if destino:
+                    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+                    shutil.copyfile(origem, destino)
+    saida_medicao = None
+    if medicao is not None:
+        saida_medicao = medicao.salvar(os.path.splitext(saida_kmz)[0] + EXTENSAO_MEDICAO)
+    return entrada, saida_kmz, saida_feicoes, saida_indice, saida_medicao
+
+
+def _destinos(args):
+    """(entrada, kmz, feições) para cada entrada; com várias, -o é um diretório."""
+    from setores.saida import EXTENSOES
+
+    extensao = EXTENSOES[args.formato]
+    if len(args.entradas) == 1:
+        entrada = args.entradas[0]
+        kmz = args.saida or os.path.splitext(entrada)[0] + '.kmz'
+        # As feições acompanham o KMZ, mesmo quando -o o põe em outro lugar
+        return [(entrada, kmz, args.geojson or os.path.splitext(kmz)[0] + extensao)]
+    diretorio = args.saida or '.'
+    destinos = []
+    for entrada in args.entradas:
+        base = os.path.join(diretorio, os.path.splitext(os.path.basename(entrada))[0])
+        destinos.append((entrada, base + '.kmz', base + extensao))
+    return destinos
+
+
+def _destinos_particionados(args, trabalho):
+    """Divide a única entrada em partições; -o é o diretório das saídas."""
+    from setores.lotes import particionar
+    from setores.saida import EXTENSOES
+
+    if len(args.entradas) > 1:
+        raise ValueError("--particionar aceita uma única entrada.")
+    if args.geojson:
+        raise ValueError("Com --particionar, use --formato em vez de --geojson.")
+    diretorio = args.saida or os.path.splitext(args.entradas[0])[0]
+    destinos = []
+    for nome, caminho, _ in particionar(args.entradas[0], args.particionar, trabalho, args.tamanho_bloco):
+        base = os.path.join(diretorio, nome)
+        destinos.append((caminho, base + '.kmz', base + EXTENSOES[args.formato]))
+    return diretorio, destinos
+
+
+def _executar(destinos, opcoes, workers):
+    """Gera cada destino, em paralelo quando há mais de um processo."""
+    workers = workers or os.cpu_count()
+    if workers > 1 and len(destinos) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(destinos))) as pool:
+            tarefas = [pool.submit(construir, *destino, opcoes) for destino in destinos]
+            return [tarefa.result() for tarefa in tarefas]
+    return [construir(*destino, opcoes) for destino in destinos]
+
+
+def comando_build(args):
+    args.formato = _formato(args.geojson, args.formato)
+    opcoes = {
+        'distancia_km': args.distancia_km,
+        'angulo': args.angulo,
+        'raio': args.raio,
+        'opacidade': args.opacidade,
+        'kml_memoria': args.kml_memoria,
+        'regionado': args.regionado,
+        'formato': args.formato,
+        'tamanho_bloco': args.tamanho_bloco,
+        'cache': args.cache,
+        'perfil': args.perfil,
+        'indice': args.indice,
+        'faixas': args.faixas,
+        'manter_repetidas': args.manter_repetidas,
+        'medicao': args.medicao,
+        'cobertura': args.cobertura,
+    }
+    if args.incremental and not args.particionar:
+        raise ValueError("--incremental exige --particionar.")
+    if not args.particionar:
+        resultados = _executar(_destinos(args), opcoes, args.workers)
+        for entrada, *saidas in resultados:
+            print(f"{entrada}: {', '.join(filter(None, saidas))}")
+        return 0
+
+    from setores.lotes import escrever_nacional
+    from setores.pipeline import NOME_DOCUMENTO
+
+    with tempfile.TemporaryDirectory() as trabalho:
+        diretorio, destinos = _destinos_particionados(args, trabalho)
+        pendentes = destinos
+        if args.incremental:
+            atualizacao = _atualizacao(args, diretorio, opcoes)
+            pendentes = atualizacao.filtrar(destinos)
+        resultados = _executar(pendentes, opcoes, args.workers)
+    for _, kmz, *saidas in resultados:
+        print(f"{os.path.splitext(os.path.basename(kmz))[0]}: {', '.join(filter(None, [kmz, *saidas]))}")
+    if args.incremental:
+        arquivos = {}
+        for _, kmz, feicoes in destinos:
+            base = os.path.splitext(kmz)[0]
+            indice = base + EXTENSAO_INDICE if opcoes['indice'] else None
+            medicao = base + EXTENSAO_MEDICAO if opcoes['medicao'] else None
+            arquivos[os.path.basename(base)] = [c for c in (kmz, feicoes, indice, medicao) if c]
+        mudancas = atualizacao.concluir(arquivos)
+        contagem = atualizacao.mudancas['Mudanca'].value_counts().to_dict()
+        print(f"mudanças: {mudancas} ({contagem or 'nenhuma'}); "
+              f"{len(destinos) - len(pendentes)} de {len(destinos)} partições sem mudança")
+    if args.nacional:
+        # Sem linhas não há partições, e nada mais criou o diretório
+        os.makedirs(diretorio, exist_ok=True)
+        nacional = escrever_nacional(os.path.join(diretorio, args.nacional), NOME_DOCUMENTO,
+                                     [kmz for _, kmz, _ in destinos])
+        print(f"nacional: {nacional}")
+    return 0
+
+
+def _atualizacao(args, diretorio, opcoes):
+    from setores.cache import hash_arquivo
+    from setores.incremental import Atualizacao
+
+    # O estado compara só o que muda as saídas; o diretório de cache e a medição não entram
+    opcoes_estado = dict(opcoes, particionar=args.particionar, cache=None, medicao=None)
+    if opcoes['faixas']:
+        opcoes_estado['faixas'] = hash_arquivo(opcoes['faixas'])
+    os.makedirs(diretorio, exist_ok=True)
+    return Atualizacao(diretorio, opcoes_estado)
+
+
+def comando_consultar(args):
+    import pandas as pd
+    from setores.indice import IndiceCobertura
+
+    pontos = list(args.ponto or [])
+    if args.pontos:
+        tabela = pd.read_csv(args.pontos, usecols=['lon', 'lat'])
+        pontos.extend(tabela[['lon', 'lat']].itertuples(index=False, name=None))
+    if not pontos and not args.caixa:
+        raise ValueError("Informe --ponto, --pontos ou --caixa.")
+    if pontos and args.caixa:
+        raise ValueError("Consulte pontos ou caixas, não os dois de uma vez.")
+    indice = IndiceCobertura.carregar(args.indice)
+    if pontos:
+        lon, lat = zip(*pontos)
+        resultado = indice.consultar_pontos(lon, lat)
+    else:
+        resultado = indice.consultar_caixas(*zip(*args.caixa))
+    resultado.to_csv(args.saida or sys.stdout, index=False)
+    return 0
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog='setores', description="Gera KMZ e feições de setores de estações.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    build = subparsers.add_parser('build', help="gera KMZ e feições a partir de CSV/Excel de licenciamento")
+    build.add_argument('entradas', nargs='+', metavar='ENTRADA', help="arquivo(s) CSV ou Excel")
+    build.add_argument('-o', '--saida', help="KMZ de saída (ou diretório, com várias entradas)")
+    build.add_argument('--geojson', help="arquivo de feições de saída; a extensão define o formato "
+                                         "(padrão: ao lado do KMZ)")
+    build.add_argument('--formato', choices=['geojson', 'fgb', 'parquet', 'pmtiles', 'mbtiles'],
+                       help="formato das feições")
+    build.add_argument('--perfil', choices=['proporcional', 'absoluto'], default='proporcional',
+                       help="distâncias por faixa: fatores da distância padrão ou tabela fixa")
+    build.add_argument('--faixas', metavar='CSV',
+                       help="tabela de faixas (inferior, superior, faixa, distancia_km) no lugar da padrão")
+    build.add_argument('--manter-repetidas', action='store_true',
+                       help="não junta as linhas que repetem o mesmo setor (entidade, estação, faixa, azimute, tecnologia)")
+    build.add_argument('--distancia-km', type=float, help="distância padrão do setor (km)")
+    build.add_argument('--angulo', type=float, help="meia abertura do setor (graus)")
+    build.add_argument('--raio', type=float, help="raio do círculo da estação (m)")
+    build.add_argument('--opacidade', type=float, help="opacidade (%%)")
+    build.add_argument('--kml-memoria', action='store_true',
+                       help="monta o KMZ em memória com simplekml em vez da gravação contínua")
+    build.add_argument('--regionado', action='store_true',
+                       help="KMZ em quadtree com Region/Lod: o Google Earth só carrega os quadros visíveis")
+    build.add_argument('--tamanho-bloco', type=int, help="lê o CSV em blocos deste número de linhas")
+    build.add_argument('--cache', help="diretório de cache em disco entre execuções")
+    build.add_argument('--workers', type=int, default=1,
+                       help="processos paralelos (várias entradas ou partições); 0 usa todos os núcleos")
+    build.add_argument('--particionar', choices=PARTICOES,
+                       help="divide a entrada por UF, município ou entidade; -o é o diretório de saída")
+    build.add_argument('--nacional', nargs='?', const=ARQUIVO_NACIONAL, metavar='KMZ',
+                       help=f"com --particionar, grava um KMZ com NetworkLinks para as partições "
+                            f"(padrão: {ARQUIVO_NACIONAL} no diretório de saída)")
+    build.add_argument('--incremental', action='store_true',
+                       help="com --particionar, refaz só as partições cujas estações mudaram desde a última "
+                            "execução no mesmo diretório e grava mudancas.geojson")
+    build.add_argument('--cobertura', action='store_true',
+                       help="acrescenta ao KMZ e às feições a união dos setores de cada entidade e faixa")
+    build.add_argument('--indice', action='store_true',
+                       help=f"grava o índice espacial ao lado do KMZ ({EXTENSAO_INDICE}) para 'setores consultar'")
+    build.add_argument('--medicao', nargs='?', const='tempo', choices=['tempo', 'memoria'],
+                       help=f"grava ao lado do KMZ ({EXTENSAO_MEDICAO}) o tempo de cada estágio; com 'memoria', "
+                            f"também o pico de memória (tracemalloc, bem mais lento)")
+    build.set_defaults(funcao=comando_build)
+
+    consultar = subparsers.add_parser('consultar', help="setores e estações que cobrem pontos ou caixas")
+    consultar.add_argument('indice', metavar='INDICE', help=f"índice gravado por 'build --indice' ({EXTENSAO_INDICE})")
+    consultar.add_argument('--ponto', nargs=2, type=float, action='append', metavar=('LON', 'LAT'),
+                           help="ponto a consultar (pode repetir)")
+    consultar.add_argument('--pontos', metavar='CSV', help="CSV com colunas lon e lat, consultadas em lote")
+    consultar.add_argument('--caixa', nargs=4, type=float, action='append', metavar=('OESTE', 'SUL', 'LESTE', 'NORTE'),
+                           help="caixa a consultar (pode repetir)")
+    consultar.add_argument('-o', '--saida', help="CSV de saída (padrão: saída padrão)")
+    consultar.set_defaults(funcao=comando_consultar)
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.funcao(args)
+    except ValueError as erro:
+        parser.error(str(erro))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Cobertura dissolvida: um MultiPolygon por entidade e faixa.
+
+Um unary_union de todos os setores de um grupo gasta quase todo o tempo
+juntando pedaços que nem se tocam. Aqui o STRtree de cada grupo separa os
+setores em componentes conexos (os que se sobrepõem, direta ou
+indiretamente); só dentro de cada componente há união, feita aos pares e
+vetorizada (shapely.union sobre arrays) até sobrar uma geometria por
+componente. Componentes diferentes são disjuntos e entram no
+MultiPolygon sem sobreposição a resolver.
+"""
+import numpy as np
+import pandas as pd
+
+COLUNAS = ['NomeEntidade', 'Faixa', 'Setores', 'geometria']
+
+
+def _componentes(i, j, n):
+    """Rótulo (menor índice) do componente conexo de cada um dos n nós, dadas as arestas i-j."""
+    rotulos = np.arange(n)
+    while True:
+        menor = np.minimum(rotulos[i], rotulos[j])
+        novos = rotulos.copy()
+        np.minimum.at(novos, i, menor)
+        np.minimum.at(novos, j, menor)
+        # Salta direto para a raiz de cada rótulo
+        while True:
+            raizes = novos[novos]
+            if np.array_equal(raizes, novos):
+                break
+            novos = raizes
+        if np.array_equal(novos, rotulos):
+            return rotulos
+        rotulos = novos
+
+
+def _unir_por_rotulo(geometrias, rotulos):
+    """(rótulos, geometrias) com a união das geometrias de cada rótulo, em rodadas de pares."""
+    import shapely
+
+    ordem = np.argsort(rotulos, kind='stable')
+    geometrias, rotulos = geometrias[ordem], rotulos[ordem]
+    while True:
+        n = len(rotulos)
+        inicio = np.r_[True, rotulos[1:] != rotulos[:-1]]
+        posicao = np.arange(n) - np.maximum.accumulate(np.where(inicio, np.arange(n), 0))
+        # Cada geometria em posição par do seu grupo absorve a seguinte, se houver
+        juntar = (posicao % 2 == 0) & np.r_[~inicio[1:], False]
+        if not juntar.any():
+            return rotulos, geometrias
+        indices = np.flatnonzero(juntar)
+        geometrias[indices] = shapely.union(geometrias[indices], geometrias[indices + 1])
+        manter = ~np.r_[False, juntar[:-1]]
+        geometrias, rotulos = geometrias[manter], rotulos[manter]
+
+
+def dissolver(entidades, faixas, vertices):
+    """DataFrame (COLUNAS) com a união dos setores de cada entidade e faixa.
+
+    vertices é o array (n, 4, 2) de calcular_setores(); Setores conta as
+    linhas de cada grupo.
+    """
+    import shapely
+
+    grupos = pd.DataFrame({'NomeEntidade': entidades, 'Faixa': faixas})
+    if grupos.empty:
+        return pd.DataFrame({coluna: [] for coluna in COLUNAS})
+    poligonos = shapely.polygons(vertices)
+    # Com ângulo de 90° ou 180° os vértices ficam alinhados e o setor não tem área
+    com_area = shapely.area(poligonos) > 0
+    codigo = grupos.groupby(['NomeEntidade', 'Faixa'], sort=True).ngroup().to_numpy()
+    ordem = np.argsort(codigo, kind='stable')
+    limites = np.flatnonzero(np.r_[True, codigo[ordem][1:] != codigo[ordem][:-1]])
+
+    origens, destinos = [], []
+    for inicio, fim in zip(limites, np.r_[limites[1:], len(ordem)]):
+        membros = ordem[inicio:fim]
+        membros = membros[com_area[membros]]
+        i, j = shapely.STRtree(poligonos[membros]).query(poligonos[membros], predicate='intersects')
+        manter = i < j
+        origens.append(membros[i[manter]])
+        destinos.append(membros[j[manter]])
+    rotulos = _componentes(np.concatenate(origens), np.concatenate(destinos), len(poligonos))
+    rotulos, unidas = _unir_por_rotulo(poligonos[com_area], rotulos[com_area])
+
+    # A união de um componente pode ter vários pedaços (setores que só se tocam num ponto)
+    partes, origem = shapely.get_parts(unidas, return_index=True)
+    # A união de setores quase sem área pode deixar linhas soltas
+    poligonais = shapely.get_type_id(partes) == shapely.GeometryType.POLYGON
+    partes, codigo_partes = partes[poligonais], codigo[rotulos[origem[poligonais]]]
+    ordem_partes = np.argsort(codigo_partes, kind='stable')
+    codigos, inicios = np.unique(codigo_partes[ordem_partes], return_index=True)
+    geometrias = [shapely.multipolygons(grupo) for grupo in np.split(partes[ordem_partes], inicios[1:])]
+
+    # Grupos só com setores sem área ficam de fora; Setores conta todas as linhas do grupo
+    primeiras = ordem[limites[codigos]]
+    return pd.DataFrame({
+        'NomeEntidade': grupos['NomeEntidade'].to_numpy()[primeiras],
+        'Faixa': grupos['Faixa'].to_numpy()[primeiras],
+        'Setores': np.diff(np.r_[limites, len(ordem)])[codigos],
+        'geometria': geometrias if len(codigos) else [],
+    })
+
+
+def poligonos_kml(geometria):
+    """[(anel externo, [anéis internos])] de cada polígono, em listas de (lon, lat)."""
+    import shapely
+
+    return [
+        (shapely.get_coordinates(poligono.exterior).tolist(),
+         [shapely.get_coordinates(anel).tolist() for anel in poligono.interiors])
+        for poligono in shapely.get_parts(geometria)
+    ]
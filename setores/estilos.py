@@ -0,0 +1,77 @@
+"""Cores e estilos KML compartilhados entre os placemarks."""
+import numpy as np
+import simplekml
+
+# Frequências (MHz) nas pontas do círculo de matizes
+FREQ_MIN_COR = 700
+FREQ_MAX_COR = 6000
+
+
+class TabelaEstilos:
+    """Registra um único simplekml.Style por combinação (cor, largura da linha).
+
+    A cor já traz o alpha (aabbggrr). Os placemarks que recebem o mesmo
+    estilo passam a referenciá-lo por styleUrl em vez de repetir um <Style>.
+    """
+
+    def __init__(self):
+        self._estilos = {}
+
+    def __len__(self):
+        return len(self._estilos)
+
+    def estilo(self, cor, largura):
+        chave = (cor, largura)
+        estilo = self._estilos.get(chave)
+        if estilo is None:
+            estilo = simplekml.Style()
+            estilo.polystyle.color = cor
+            estilo.linestyle.width = largura
+            self._estilos[chave] = estilo
+        return estilo
+
+
+def _hsv_para_rgb(h):
+    """colorsys.hsv_to_rgb(h, 1, 1) vetorizado, com as mesmas operações de ponto flutuante."""
+    i = (h * 6.0).astype(int)
+    f = (h * 6.0) - i
+    v = np.ones_like(h)
+    p = np.zeros_like(h)
+    q = 1.0 - f
+    t = 1.0 - (1.0 - f)
+    setor = (i % 6)[:, None]
+    opcoes = [(v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q)]
+    return np.select([setor == k for k in range(6)], [np.column_stack(rgb) for rgb in opcoes])
+
+
+def paleta_frequencias(freqs):
+    """{frequência: cor aabbggrr} para as frequências distintas de freqs."""
+    unicas = np.unique(np.asarray(freqs, dtype=float))
+    hue = ((unicas - FREQ_MIN_COR) / (FREQ_MAX_COR - FREQ_MIN_COR)) % 1.0
+    rgb = (_hsv_para_rgb(hue) * 255).astype(int)
+    return {freq: simplekml.Color.rgb(r, g, b) for freq, (r, g, b) in zip(unicas.tolist(), rgb.tolist())}
+
+
+def cores_frequencias(freqs, alpha):
+    """Cor de cada frequência, com o alpha dado, a partir da paleta das distintas."""
+    freqs = np.asarray(freqs, dtype=float)
+    unicas, inversa = np.unique(freqs, return_inverse=True)
+    paleta = paleta_frequencias(unicas)
+    cores = np.array([simplekml.Color.changealphaint(alpha, paleta[freq]) for freq in unicas.tolist()], dtype=object)
+    return cores[inversa.reshape(-1)]
+
+
+def get_color(freq):
+    return next(iter(paleta_frequencias([freq]).values()))
+
+
+def cor_operadora(operadora, alpha):
+    operadora = str(operadora).strip().upper().split()[0] if operadora else ""
+    if operadora == 'CLARO':
+        return simplekml.Color.changealphaint(alpha, simplekml.Color.red)
+    elif operadora == 'TELEFONICA':
+        return simplekml.Color.changealphaint(alpha, simplekml.Color.purple)
+    elif operadora == 'TIM':
+        return simplekml.Color.changealphaint(alpha, simplekml.Color.blue)
+    else:
+        return simplekml.Color.changealphaint(alpha, simplekml.Color.white)
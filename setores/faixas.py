@@ -0,0 +1,106 @@
+"""Faixas de frequência e distâncias dos setores por faixa.
+
+A classificação vem de uma tabela (inferior, superior, faixa, distância)
+aplicada à coluna inteira por busca de intervalo. Uma faixa nova entra na
+tabela, ou num CSV lido por carregar_faixas(), sem mexer no código.
+"""
+import numpy as np
+
+# Distância padrão a que os fatores proporcionais se referem
+DISTANCIA_REFERENCIA_KM = 1.5
+
+# [inferior, superior) em MHz, faixa e distância (km) do setor; faixas fora
+# da tabela usam a própria frequência e a distância padrão
+FAIXAS = [
+    (450, 480, 450, 1.5),
+    (764, 803, 700, 1.4),
+    (864, 895, 850, 1.3),
+    (943, 960, 900, 1.2),
+    (1800, 1880, 1800, 1.1),
+    (2100, 2170, 2100, 1),
+    (2300, 2400, 2300, 0.9),
+    (2570, 2620, 2500, 0.8),
+    (2620, 2690, 2600, 0.7),
+    (3300, 3700, 3500, 0.6),
+    (4830, 4950, 4900, 0.5),
+]
+COLUNAS_FAIXAS = ['inferior', 'superior', 'faixa', 'distancia_km']
+
+
+class TabelaFaixas:
+    """Intervalos de frequência ordenados, classificados com np.searchsorted."""
+
+    def __init__(self, faixas=FAIXAS, distancia_referencia_km=DISTANCIA_REFERENCIA_KM):
+        self.linhas = sorted(tuple(linha) for linha in faixas)
+        self.distancia_referencia_km = distancia_referencia_km
+        self.inferior = np.array([linha[0] for linha in self.linhas], dtype=float)
+        self.superior = np.array([linha[1] for linha in self.linhas], dtype=float)
+        self.faixa = [linha[2] for linha in self.linhas]
+        if np.any(self.inferior >= self.superior) or np.any(self.superior[:-1] > self.inferior[1:]):
+            raise ValueError("Tabela de faixas com intervalos vazios ou sobrepostos.")
+
+    def chave(self):
+        """Identidade da tabela para as chaves do cache."""
+        return self.linhas, self.distancia_referencia_km
+
+    def _unicas(self, freqs):
+        unicas, inversa = np.unique(np.asarray(freqs, dtype=float), return_inverse=True)
+        posicao = np.searchsorted(self.inferior, unicas, side='right') - 1
+        dentro = (posicao >= 0) & (unicas < self.superior[np.maximum(posicao, 0)])
+        faixas = [self.faixa[p] if d else f for p, d, f in zip(posicao.tolist(), dentro.tolist(), unicas.tolist())]
+        return unicas, faixas, inversa.reshape(-1)
+
+    def por_frequencia(self, freqs):
+        """{frequência: faixa} para as frequências distintas de freqs."""
+        unicas, faixas, _ = self._unicas(freqs)
+        return dict(zip(unicas.tolist(), faixas))
+
+    def classificar(self, freqs):
+        """Faixa de cada frequência (a própria frequência fora da tabela)."""
+        _, faixas, inversa = self._unicas(freqs)
+        return np.array(faixas, dtype=object)[inversa]
+
+    def distancias_setor(self, freqs, distancias_faixa, distancia_km):
+        """Distância (km) do setor de cada frequência, pelo mapa faixa → km."""
+        _, faixas, inversa = self._unicas(freqs)
+        return np.array([distancias_faixa.get(faixa, distancia_km) for faixa in faixas], dtype=float)[inversa]
+
+    def distancias_por_faixa(self):
+        return {faixa: distancia for _, _, faixa, distancia in self.linhas}
+
+    def fatores(self):
+        return {faixa: distancia / self.distancia_referencia_km for _, _, faixa, distancia in self.linhas}
+
+    def distancias_por_fator(self, distancia_km):
+        return distancias_por_fator(distancia_km, self.fatores())
+
+
+def carregar_faixas(caminho, distancia_referencia_km=DISTANCIA_REFERENCIA_KM):
+    """Lê uma TabelaFaixas de um CSV com as colunas de COLUNAS_FAIXAS."""
+    import pandas as pd
+
+    tabela = pd.read_csv(caminho)
+    if not all(coluna in tabela.columns for coluna in COLUNAS_FAIXAS):
+        raise ValueError(f"Tabela de faixas deve ter as colunas: {', '.join(COLUNAS_FAIXAS)}.")
+    linhas = []
+    for inferior, superior, faixa, distancia in tabela[COLUNAS_FAIXAS].itertuples(index=False, name=None):
+        linhas.append((float(inferior), float(superior), int(faixa) if float(faixa).is_integer() else float(faixa),
+                       float(distancia)))
+    return TabelaFaixas(linhas, distancia_referencia_km)
+
+
+TABELA_FAIXAS = TabelaFaixas()
+
+# Distância (km) do setor por faixa; faixas fora da tabela usam a distância padrão
+DISTANCIAS_FAIXA = TABELA_FAIXAS.distancias_por_faixa()
+
+# Fatores proporcionais por faixa (distância da faixa / DISTANCIA_REFERENCIA_KM)
+FAIXA_FATORES = TABELA_FAIXAS.fatores()
+
+
+def faixas(freq, tabela=TABELA_FAIXAS):
+    return tabela.classificar([freq])[0]
+
+
+def distancias_por_fator(distancia_km, fatores=FAIXA_FATORES):
+    return {faixa: distancia_km * fator for faixa, fator in fatores.items()}
@@ -0,0 +1,61 @@
+"""Geometria vetorizada dos setores e círculos das estações.
+
+Todas as funções recebem colunas inteiras (arrays) e calculam os vértices
+numa única passada; os auxiliares por linha são apenas invólucros finos.
+"""
+import numpy as np
+
+RAIO_TERRA_KM = 6371
+RAIO_TERRA_M = 6371000
+NUM_PONTOS_CIRCULO = 36
+
+
+# --- NÚCLEO VETORIZADO ---
+def destino(lat, lon, azimute, distancia, raio):
+    """Ponto de destino (lat, lon) em graus, com broadcast entre os argumentos."""
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    az_rad = np.radians(azimute)
+    d = np.asarray(distancia, dtype=float) / raio
+    lat2 = np.arcsin(np.sin(lat_rad) * np.cos(d) +
+                     np.cos(lat_rad) * np.sin(d) * np.cos(az_rad))
+    lon2 = lon_rad + np.arctan2(np.sin(az_rad) * np.sin(d) * np.cos(lat_rad),
+                                np.cos(d) - np.sin(lat_rad) * np.sin(lat2))
+    return np.degrees(lat2), np.degrees(lon2)
+
+
+def calcular_setores(lat, lon, azimute, distancia_km, setor_angulo):
+    """Vértices (lon, lat) de todos os setores: array (n, 4, 2) fechado no centro."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    azimute = np.asarray(azimute, dtype=float)
+    distancia_km = np.broadcast_to(np.asarray(distancia_km, dtype=float), lat.shape)
+    azimutes = np.stack([azimute - setor_angulo, azimute + setor_angulo], axis=-1)
+    lat2, lon2 = destino(lat[:, None], lon[:, None], azimutes, distancia_km[:, None], RAIO_TERRA_KM)
+    vertices = np.empty((lat.shape[0], 4, 2))
+    vertices[:, 0, 0] = lon
+    vertices[:, 0, 1] = lat
+    vertices[:, 1:3, 0] = lon2
+    vertices[:, 1:3, 1] = lat2
+    vertices[:, 3] = vertices[:, 0]
+    return vertices
+
+
+def gerar_circulos(lat, lon, raio_metros, num_pontos=NUM_PONTOS_CIRCULO):
+    """Vértices (lon, lat) dos círculos das estações: array (n, num_pontos, 2)."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    angulos = np.arange(num_pontos, dtype=float) * 360 / num_pontos
+    lat2, lon2 = destino(lat[:, None], lon[:, None], angulos[None, :], raio_metros, RAIO_TERRA_M)
+    return np.stack([lon2, lat2], axis=-1)
+
+
+# --- AUXILIARES POR LINHA ---
+def calcular_pontos(lat, lon, azimute1, azimute2, distancia_km):
+    lat2, lon2 = destino(lat, lon, np.array([azimute1, azimute2], dtype=float),
+                         distancia_km, RAIO_TERRA_KM)
+    return list(zip(lat2.tolist(), lon2.tolist()))
+
+
+def gerar_circulo(lat, lon, raio_metros, num_pontos=NUM_PONTOS_CIRCULO):
+    return [tuple(p) for p in gerar_circulos([lat], [lon], raio_metros, num_pontos)[0].tolist()]
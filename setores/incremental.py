@@ -0,0 +1,145 @@
+"""Atualização incremental de uma saída particionada entre exportações.
+
+Cada estação (entidade, NumEstacao) recebe uma impressão digital das suas
+linhas. O estado da última execução fica no diretório de saída (as opções e
+os arquivos em JSON, as estações em Parquet); na seguinte, só as partições com estações adicionadas, removidas ou alteradas são
+geradas de novo, e as mudanças vão para um GeoJSON de registro.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from setores.leitura import REQUIRED_COLUMNS, ler_licenciamento
+from setores.normalizacao import normalizar_entidades
+from setores.saida import abrir_saida
+
+ARQUIVO_ESTADO = "estado_incremental.json"
+ARQUIVO_ESTACOES = "estado_incremental.parquet"
+ARQUIVO_MUDANCAS = "mudancas.geojson"
+CHAVES_IMPRESSAO = ['NomeEntidade', 'NumEstacao']
+CAMPOS_MUDANCAS = ['Mudanca', 'NomeEntidade', 'NumEstacao', 'Particao']
+
+
+def impressoes_estacoes(df):
+    """Uma linha por estação com posição e impressão (uint64) das suas linhas.
+
+    A impressão soma os hashes das linhas, então não depende da ordem em
+    que a exportação as traz.
+    """
+    df = df[REQUIRED_COLUMNS].assign(NomeEntidade=normalizar_entidades(df['NomeEntidade']))
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    grupos = df.groupby(CHAVES_IMPRESSAO, sort=False)
+    impressao = np.zeros(grupos.ngroups, dtype=np.uint64)
+    np.add.at(impressao, grupos.ngroup().to_numpy(), hashes)
+    estacoes = df.drop_duplicates(CHAVES_IMPRESSAO)[CHAVES_IMPRESSAO + ['Latitude', 'Longitude']]
+    return estacoes.assign(Impressao=impressao).reset_index(drop=True)
+
+
+def comparar(anteriores, atuais):
+    """Estações adicionadas, removidas ou alteradas entre dois estados.
+
+    Uma estação que mudou de partição conta como alterada, mesmo com as
+    mesmas linhas. Devolve as colunas de impressoes_estacoes() mais Particao_anterior,
+    Particao_atual e Mudanca; a posição é a atual (a anterior, se removida).
+    """
+    juncao = anteriores.merge(atuais, on=CHAVES_IMPRESSAO, how='outer', suffixes=('_anterior', '_atual'),
+                              indicator=True)
+    mudanca = np.select(
+        [juncao['_merge'] == 'right_only', juncao['_merge'] == 'left_only',
+         (juncao['Impressao_anterior'] != juncao['Impressao_atual'])
+         | (juncao['Particao_anterior'] != juncao['Particao_atual'])],
+        ['adicionada', 'removida', 'alterada'],
+        default='',
+    )
+    juncao = juncao.assign(
+        Mudanca=mudanca,
+        Latitude=juncao['Latitude_atual'].fillna(juncao['Latitude_anterior']),
+        Longitude=juncao['Longitude_atual'].fillna(juncao['Longitude_anterior']),
+    )
+    return juncao[juncao['Mudanca'] != ''][
+        CHAVES_IMPRESSAO + ['Latitude', 'Longitude', 'Particao_anterior', 'Particao_atual', 'Mudanca']
+    ].reset_index(drop=True)
+
+
+def escrever_mudancas(caminho, mudancas):
+    saida = abrir_saida(caminho, 'geojson', campos=CAMPOS_MUDANCAS)
+    for linha in mudancas.itertuples(index=False):
+        particao = linha.Particao_atual if isinstance(linha.Particao_atual, str) else linha.Particao_anterior
+        saida.ponto(linha.Longitude, linha.Latitude, {
+            "Mudanca": linha.Mudanca,
+            "NomeEntidade": linha.NomeEntidade,
+            "NumEstacao": linha.NumEstacao,
+            "Particao": particao,
+        })
+    saida.fechar()
+
+
+class Atualizacao:
+    """Decide quais partições refazer e grava o novo estado ao final.
+
+    opcoes identifica os parâmetros da geração: se mudarem em relação à
+    execução anterior, todas as partições são refeitas.
+    """
+
+    def __init__(self, diretorio, opcoes):
+        if pyarrow is None:
+            raise ImportError("A atualização incremental grava as estações em Parquet e exige pyarrow.")
+        self.diretorio = diretorio
+        # Como volta do JSON, para a comparação com o estado anterior não depender de tuplas x listas
+        self.opcoes = json.loads(json.dumps(opcoes))
+        self.anterior = None
+        caminho = os.path.join(diretorio, ARQUIVO_ESTADO)
+        if os.path.exists(caminho):
+            with open(caminho, encoding='utf-8') as f:
+                self.anterior = json.load(f)
+            self.anterior['estacoes'] = pd.read_parquet(os.path.join(diretorio, ARQUIVO_ESTACOES))
+        self.estacoes = None
+        self.mudancas = None
+
+    def filtrar(self, destinos):
+        """Só os destinos (tabela, kmz, feições) das partições que precisam ser refeitas."""
+        estados = []
+        for tabela, kmz, _ in destinos:
+            particao = os.path.splitext(os.path.basename(kmz))[0]
+            estados.append(impressoes_estacoes(ler_licenciamento(tabela)).assign(Particao=particao))
+        self.estacoes = pd.concat(estados, ignore_index=True)
+        anteriores = self.anterior['estacoes'] if self.anterior else self.estacoes.iloc[:0]
+        self.mudancas = comparar(anteriores, self.estacoes)
+        if not self.anterior or self.anterior['opcoes'] != self.opcoes:
+            return list(destinos)
+        afetadas = set(self.mudancas['Particao_anterior'].dropna()) | set(self.mudancas['Particao_atual'].dropna())
+        return [
+            (tabela, kmz, feicoes) for tabela, kmz, feicoes in destinos
+            if os.path.splitext(os.path.basename(kmz))[0] in afetadas
+            or not (os.path.exists(kmz) and os.path.exists(feicoes))
+        ]
+
+    def concluir(self, arquivos):
+        """Remove as saídas de partições extintas e grava o registro e o novo estado.
+
+        arquivos mapeia cada partição atual aos caminhos que ela gerou.
+        """
+        if self.anterior:
+            for particao, caminhos in self.anterior['arquivos'].items():
+                if particao not in arquivos:
+                    for caminho in caminhos:
+                        if os.path.exists(caminho):
+                            os.remove(caminho)
+        caminho_mudancas = os.path.join(self.diretorio, ARQUIVO_MUDANCAS)
+        escrever_mudancas(caminho_mudancas, self.mudancas)
+        # As estações antes do JSON: é o JSON trocado que conclui a gravação do estado
+        temporario = os.path.join(self.diretorio, ARQUIVO_ESTACOES + ".tmp")
+        self.estacoes.to_parquet(temporario, index=False)
+        os.replace(temporario, os.path.join(self.diretorio, ARQUIVO_ESTACOES))
+        temporario = os.path.join(self.diretorio, ARQUIVO_ESTADO + ".tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({'opcoes': self.opcoes, 'arquivos': arquivos}, f, ensure_ascii=False)
+        os.replace(temporario, os.path.join(self.diretorio, ARQUIVO_ESTADO))
+        return caminho_mudancas
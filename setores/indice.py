@@ -0,0 +1,69 @@
+"""Índice espacial (STRtree) dos círculos das estações e dos setores.
+
+O índice é salvo como .npz com os vértices dos setores, o centro e o raio
+dos círculos (refeitos ao carregar, que é mais rápido que lê-los do disco)
+e os atributos de cada polígono; carregar monta os polígonos e a árvore de uma vez com shapely,
+sem voltar à planilha nem à geometria dos setores. As consultas recebem
+vetores de pontos ou de caixas e devolvem um DataFrame com uma linha por
+par (consulta, polígono).
+"""
+import numpy as np
+import pandas as pd
+import shapely
+
+from setores.geometria import gerar_circulos
+
+ARQUIVO_INDICE = "setores_estacoes.indice.npz"
+ATRIBUTOS = ['Tipo', 'NomeEntidade', 'NumEstacao', 'FreqTxMHz', 'Faixa', 'Azimute', 'Tecnologia']
+
+
+class IndiceCobertura:
+    """STRtree sobre os polígonos de setores e círculos, com seus atributos."""
+
+    def __init__(self, vertices_setores, centros, raio_circulo_metros, atributos):
+        self._vertices_setores = vertices_setores
+        self._centros = centros
+        self._raio = raio_circulo_metros
+        self.atributos = pd.DataFrame(atributos, columns=ATRIBUTOS)
+        circulos = gerar_circulos(centros[:, 1], centros[:, 0], raio_circulo_metros)
+        # shapely.polygons fecha os anéis dos círculos, que chegam sem repetir o primeiro vértice;
+        # sem nenhum (planilha só com o cabeçalho), o índice fica vazio
+        poligonos = [shapely.polygons(v) for v in (vertices_setores, circulos) if len(v)]
+        self.geometrias = np.concatenate(poligonos) if poligonos else np.empty(0, dtype=object)
+        self.arvore = shapely.STRtree(self.geometrias)
+
+    def __len__(self):
+        return len(self.geometrias)
+
+    @classmethod
+    def carregar(cls, caminho):
+        with np.load(caminho, allow_pickle=False) as dados:
+            atributos = {coluna: dados[coluna] for coluna in ATRIBUTOS}
+            return cls(dados['setores'], dados['centros'], float(dados['raio']), atributos)
+
+    def salvar(self, caminho):
+        atributos = {}
+        for coluna in ATRIBUTOS:
+            valores = self.atributos[coluna].to_numpy()
+            # Texto vai como unicode de tamanho fixo, para carregar sem pickle
+            atributos[coluna] = valores.astype(str) if valores.dtype == object else valores
+        with open(caminho, 'wb') as f:
+            np.savez(f, setores=self._vertices_setores, centros=self._centros, raio=self._raio, **atributos)
+        return caminho
+
+    def _resultado(self, pares):
+        consultas, poligonos = pares
+        resultado = self.atributos.iloc[poligonos].reset_index(drop=True)
+        resultado.insert(0, 'consulta', consultas)
+        return resultado
+
+    def consultar_pontos(self, lon, lat):
+        """Polígonos que contêm cada ponto (lon, lat), em lote."""
+        pontos = shapely.points(np.atleast_1d(np.asarray(lon, dtype=float)),
+                                np.atleast_1d(np.asarray(lat, dtype=float)))
+        return self._resultado(self.arvore.query(pontos, predicate='intersects'))
+
+    def consultar_caixas(self, oeste, sul, leste, norte, predicado='intersects'):
+        """Polígonos que tocam (ou, com predicado='contains', ficam dentro de) cada caixa."""
+        caixas = shapely.box(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in (oeste, sul, leste, norte)))
+        return self._resultado(self.arvore.query(caixas, predicate=predicado))
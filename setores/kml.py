@@ -0,0 +1,425 @@
+"""Escritores de KMZ: árvore simplekml em memória ou gravação contínua.
+
+Os dois expõem a mesma interface: ``documento.newfolder(nome)`` devolve
+uma pasta com ``newfolder``, ``poligono`` e ``multipoligono``; ``fechar()``
+grava o arquivo.
+
+Na gravação contínua, cada documento é um fluxo deflate em duas partes: o
+início (cabeçalho e estilos) e o corpo. aplicar_estilos() troca a opacidade
+comprimindo de novo só o início e copiando o corpo já comprimido.
+"""
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+from xml.sax.saxutils import escape
+
+import simplekml
+
+from setores.estilos import TabelaEstilos
+
+CABECALHO_KML = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<kml xmlns="http://www.opengis.net/kml/2.2" '
+                 'xmlns:gx="http://www.google.com/kml/ext/2.2">')
+TAMANHO_BUFFER_KML = 1024 * 1024
+# Campo de 32 bits que manda ler o valor no extra ZIP64; a partir de LIMITE_ZIP32 usa-se o extra
+MARCA_ZIP64 = 0xFFFFFFFF
+LIMITE_ZIP32 = MARCA_ZIP64
+CABECALHO_LOCAL_ZIP = struct.Struct('<IHHHHHIIIHH')
+CABECALHO_CENTRAL_ZIP = struct.Struct('<IHHHHHHIIIHHHHHII')
+FIM_ZIP = struct.Struct('<IHHHHIIH')
+FIM_ZIP64 = struct.Struct('<IQHHIIQQQQ')
+LOCALIZADOR_ZIP64 = struct.Struct('<IIQI')
+
+
+def _coordenadas(coords):
+    return " ".join("{0},{1},{2}".format(c[0], c[1], c[2] if len(c) > 2 else 0.0) for c in coords)
+
+
+def _anel(tag, coords):
+    return f"<{tag}><LinearRing><coordinates>{_coordenadas(coords)}</coordinates></LinearRing></{tag}>"
+
+
+def abrir_kmz(caminho, nome, continuo=False):
+    if continuo:
+        return KmzContinuo(caminho, nome)
+    return KmzEmMemoria(caminho, nome)
+
+
+def id_estilo(cor, largura):
+    """Id estável de um estilo, sem o alpha da cor (aabbggrr)."""
+    return f"e{cor[2:]}_{largura:g}".replace('.', '_')
+
+
+def _regiao(caixa, min_lod, max_lod):
+    oeste, sul, leste, norte = caixa
+    return (f"<Region><LatLonAltBox><north>{norte}</north><south>{sul}</south>"
+            f"<east>{leste}</east><west>{oeste}</west></LatLonAltBox>"
+            f"<Lod><minLodPixels>{min_lod}</minLodPixels><maxLodPixels>{max_lod}</maxLodPixels></Lod></Region>")
+
+
+def kml_estilos(estilos, alpha=None):
+    """<Style> de cada (cor, largura), com a cor na opacidade alpha (ou como veio)."""
+    partes = []
+    for cor, largura in estilos:
+        if alpha is not None:
+            cor = simplekml.Color.changealphaint(alpha, cor)
+        partes.append(
+            f'<Style id="{id_estilo(cor, largura)}"><LineStyle><width>{largura}</width></LineStyle>'
+            f"<PolyStyle><color>{cor}</color></PolyStyle></Style>"
+        )
+    return "".join(partes)
+
+
+def aplicar_estilos(base, destino, pecas, alpha):
+    """Regrava o KMZ base com os estilos na opacidade dada.
+
+    pecas são as de KmzContinuo.peca de cada documento do base. Só o início
+    de cada documento é comprimido de novo; o corpo é copiado como está.
+    """
+    with open(base, 'rb') as origem, EscritorZip(destino) as kmz:
+        for peca in pecas:
+            origem.seek(peca['deslocamento'])
+            kmz.entrada(peca['arquivo'], peca['cabecalho'] + kml_estilos(peca['estilos'], alpha),
+                        origem, peca['comprimido'], peca['crc'], peca['tamanho'])
+
+
+def escrever_rede(caminho, nome, links):
+    """Grava um KMZ só com NetworkLinks para (nome, href) de cada KMZ em links.
+
+    Os href relativos são resolvidos a partir do próprio KMZ: um arquivo ao
+    lado dele é referenciado como ``../arquivo.kmz``.
+    """
+    partes = [CABECALHO_KML, f"<Document><name>{escape(str(nome))}</name><open>1</open>"]
+    for nome_link, href in links:
+        partes.append(
+            f"<NetworkLink><name>{escape(str(nome_link))}</name><visibility>0</visibility>"
+            f"<Link><href>{escape(href)}</href></Link></NetworkLink>"
+        )
+    partes.append("</Document></kml>")
+    with zipfile.ZipFile(caminho, 'w', zipfile.ZIP_DEFLATED) as kmz:
+        kmz.writestr(zipfile.ZipInfo('doc.kml', date_time=time.localtime()[:6]), "".join(partes),
+                     compress_type=zipfile.ZIP_DEFLATED)
+
+
+# --- ZIP ---
+def _gf2_vezes(matriz, vetor):
+    soma = 0
+    for linha in matriz:
+        if not vetor:
+            break
+        if vetor & 1:
+            soma ^= linha
+        vetor >>= 1
+    return soma
+
+
+def _gf2_quadrado(matriz):
+    return [_gf2_vezes(matriz, linha) for linha in matriz]
+
+
+def crc32_concatenado(crc1, crc2, tamanho2):
+    """CRC-32 de a + b dados o CRC de a, o de b e o tamanho de b (crc32_combine do zlib)."""
+    # Operador que avança o CRC por um bit zero; elevado ao quadrado, por 2, 4, 8... bits
+    impar = [0xEDB88320] + [1 << i for i in range(31)]
+    par = _gf2_quadrado(impar)
+    impar = _gf2_quadrado(par)
+    while tamanho2:
+        par = _gf2_quadrado(impar)
+        if tamanho2 & 1:
+            crc1 = _gf2_vezes(par, crc1)
+        tamanho2 >>= 1
+        if not tamanho2:
+            break
+        impar = _gf2_quadrado(par)
+        if tamanho2 & 1:
+            crc1 = _gf2_vezes(impar, crc1)
+        tamanho2 >>= 1
+    return crc1 ^ crc2
+
+
+def _hora_data_dos():
+    ano, mes, dia, hora, minuto, segundo = time.localtime()[:6]
+    return (hora << 11) | (minuto << 5) | (segundo // 2), ((ano - 1980) << 9) | (mes << 5) | dia
+
+
+def _copiar(origem, destino, tamanho):
+    while tamanho:
+        bloco = origem.read(min(tamanho, TAMANHO_BUFFER_KML))
+        if not bloco:
+            raise EOFError("Corpo comprimido mais curto que o esperado.")
+        destino.write(bloco)
+        tamanho -= len(bloco)
+
+
+class EscritorZip:
+    """ZIP cujas entradas são um início comprimido na hora e um corpo deflate já pronto.
+
+    O zipfile só grava conteúdo que ele mesmo comprime; aqui o corpo vem de
+    um arquivo e é copiado. Usa ZIP64 quando algum tamanho ou deslocamento
+    passa de 4 GiB.
+    """
+
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, 'wb')
+        self._centrais = []
+
+    def entrada(self, nome, inicio, corpo, comprimido, crc_corpo, tamanho_corpo):
+        """Grava nome com o texto inicio seguido do corpo; devolve onde o corpo começa no ZIP.
+
+        corpo é um arquivo posicionado num fluxo deflate (sem cabeçalho zlib)
+        de comprimido bytes, com crc_corpo e tamanho_corpo do texto original.
+        """
+        dados = inicio.encode('utf-8')
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        # O flush de sincronização fecha o início sem bloco final; o corpo continua o mesmo fluxo
+        dados_comprimidos = compressor.compress(dados) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        crc = crc32_concatenado(zlib.crc32(dados), crc_corpo, tamanho_corpo)
+        tamanho = len(dados) + tamanho_corpo
+        comprimido_total = len(dados_comprimidos) + comprimido
+        nome = nome.encode('utf-8')
+        hora, data = _hora_data_dos()
+        deslocamento = self._arquivo.tell()
+        zip64 = max(tamanho, comprimido_total) >= LIMITE_ZIP32
+        extra = struct.pack('<HHQQ', 1, 16, tamanho, comprimido_total) if zip64 else b''
+        self._arquivo.write(CABECALHO_LOCAL_ZIP.pack(
+            0x04034b50, 45 if zip64 else 20, 0, zipfile.ZIP_DEFLATED, hora, data, crc,
+            MARCA_ZIP64 if zip64 else comprimido_total, MARCA_ZIP64 if zip64 else tamanho, len(nome), len(extra)
+        ))
+        self._arquivo.write(nome + extra + dados_comprimidos)
+        inicio_corpo = self._arquivo.tell()
+        _copiar(corpo, self._arquivo, comprimido)
+        self._centrais.append((nome, hora, data, crc, comprimido_total, tamanho, deslocamento))
+        return inicio_corpo
+
+    def fechar(self):
+        if self._arquivo.closed:
+            return
+        inicio_central = self._arquivo.tell()
+        for nome, hora, data, crc, comprimido, tamanho, deslocamento in self._centrais:
+            zip64 = max(tamanho, comprimido, deslocamento) >= LIMITE_ZIP32
+            extra = struct.pack('<HHQQQ', 1, 24, tamanho, comprimido, deslocamento) if zip64 else b''
+            if zip64:
+                comprimido = tamanho = deslocamento = MARCA_ZIP64
+            versao = 45 if zip64 else 20
+            self._arquivo.write(CABECALHO_CENTRAL_ZIP.pack(
+                0x02014b50, versao, versao, 0, zipfile.ZIP_DEFLATED, hora, data, crc, comprimido, tamanho,
+                len(nome), len(extra), 0, 0, 0, 0, deslocamento
+            ))
+            self._arquivo.write(nome + extra)
+        tamanho_central = self._arquivo.tell() - inicio_central
+        n = len(self._centrais)
+        zip64 = n >= 0xFFFF or max(inicio_central, tamanho_central) >= LIMITE_ZIP32
+        if zip64:
+            fim64 = self._arquivo.tell()
+            self._arquivo.write(FIM_ZIP64.pack(0x06064b50, FIM_ZIP64.size - 12, 45, 45, 0, 0, n, n,
+                                               tamanho_central, inicio_central))
+            self._arquivo.write(LOCALIZADOR_ZIP64.pack(0x07064b50, 0, fim64, 1))
+        self._arquivo.write(FIM_ZIP.pack(0x06054b50, 0, 0, min(n, 0xFFFF), min(n, 0xFFFF),
+                                         MARCA_ZIP64 if zip64 else tamanho_central,
+                                         MARCA_ZIP64 if zip64 else inicio_central, 0))
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+# --- ÁRVORE EM MEMÓRIA (simplekml) ---
+class _PastaSimplekml:
+    def __init__(self, pasta, estilos):
+        self._pasta = pasta
+        self._estilos = estilos
+
+    def newfolder(self, name):
+        return _PastaSimplekml(self._pasta.newfolder(name=name), self._estilos)
+
+    def poligono(self, nome, descricao, coords, cor, largura):
+        pol = self._pasta.newpolygon(name=nome, description=descricao)
+        pol.outerboundaryis = coords
+        pol.style = self._estilos.estilo(cor, largura)
+
+    def multipoligono(self, nome, descricao, poligonos, cor, largura):
+        """poligonos: [(anel externo, [anéis internos])]."""
+        geometria = self._pasta.newmultigeometry(name=nome, description=descricao)
+        for externo, internos in poligonos:
+            geometria.newpolygon(outerboundaryis=externo, innerboundaryis=internos)
+        geometria.style = self._estilos.estilo(cor, largura)
+
+
+class KmzEmMemoria(_PastaSimplekml):
+    """Monta o simplekml.Kml inteiro e só grava o KMZ em fechar()."""
+
+    def __init__(self, caminho, nome):
+        self._caminho = caminho
+        self.kml = simplekml.Kml()
+        self.kml.document.name = nome
+        self.kml.document.open = 1
+        super().__init__(self.kml.document, TabelaEstilos())
+
+    def fechar(self):
+        self.kml.savekmz(self._caminho, format=False)
+
+    def descartar(self):
+        """Abandona o documento sem gravar (após um erro)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, *exc):
+        if tipo is None:
+            self.fechar()
+        else:
+            self.descartar()
+
+
+# --- GRAVAÇÃO CONTÍNUA ---
+class _PastaContinua:
+    def __init__(self, documento, nivel):
+        self._documento = documento
+        self._nivel = nivel
+
+    def newfolder(self, name):
+        self._documento._fechar_ate(self._nivel)
+        self._documento._escrever(f"<Folder><name>{escape(str(name))}</name>")
+        self._documento._abertas += 1
+        return _PastaContinua(self._documento, self._nivel + 1)
+
+    def poligono(self, nome, descricao, coords, cor, largura):
+        self._documento._fechar_ate(self._nivel)
+        url_estilo = self._documento._estilo(cor, largura)
+        self._documento._escrever(
+            f"<Placemark><name>{escape(str(nome))}</name>"
+            f"<description>{escape(str(descricao))}</description>"
+            f"<styleUrl>{url_estilo}</styleUrl>"
+            f"<Polygon><outerBoundaryIs><LinearRing><coordinates>{_coordenadas(coords)}"
+            f"</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>"
+        )
+
+    def multipoligono(self, nome, descricao, poligonos, cor, largura):
+        """poligonos: [(anel externo, [anéis internos])]."""
+        self._documento._fechar_ate(self._nivel)
+        url_estilo = self._documento._estilo(cor, largura)
+        self._documento._escrever(
+            f"<Placemark><name>{escape(str(nome))}</name>"
+            f"<description>{escape(str(descricao))}</description>"
+            f"<styleUrl>{url_estilo}</styleUrl><MultiGeometry>"
+        )
+        for externo, internos in poligonos:
+            self._documento._escrever(
+                "<Polygon>" + _anel("outerBoundaryIs", externo)
+                + "".join(_anel("innerBoundaryIs", anel) for anel in internos) + "</Polygon>"
+            )
+        self._documento._escrever("</MultiGeometry></Placemark>")
+
+    def ponto(self, nome, descricao, lon, lat):
+        self._documento._fechar_ate(self._nivel)
+        self._documento._escrever(
+            f"<Placemark><name>{escape(str(nome))}</name>"
+            f"<description>{escape(str(descricao))}</description>"
+            f"<Point><coordinates>{lon},{lat},0</coordinates></Point></Placemark>"
+        )
+
+    def regiao(self, caixa, min_lod, max_lod=-1):
+        """Region (oeste, sul, leste, norte) desta pasta; chamar logo após criá-la."""
+        self._documento._escrever(_regiao(caixa, min_lod, max_lod))
+
+    def link(self, nome, href, caixa, min_lod, max_lod=-1):
+        """NetworkLink carregado só quando a caixa ocupa ao menos min_lod pixels."""
+        self._documento._fechar_ate(self._nivel)
+        self._documento._escrever(
+            f"<NetworkLink><name>{escape(str(nome))}</name>{_regiao(caixa, min_lod, max_lod)}"
+            f"<Link><href>{escape(href)}</href><viewRefreshMode>onRegion</viewRefreshMode></Link></NetworkLink>"
+        )
+
+
+class KmzContinuo(_PastaContinua):
+    """Grava pastas e placemarks direto na entrada doc.kml do KMZ.
+
+    Uma pasta fica aberta até que se crie uma irmã (ou algo num nível acima),
+    então a memória não depende do tamanho da exportação. O corpo vai
+    comprimido para um temporário enquanto é escrito; os estilos usados vão
+    no início do documento, montado só em fechar(). ``peca`` diz depois onde
+    ficou cada parte, para aplicar_estilos().
+
+    Com kmz (um EscritorZip já aberto), o documento é gravado como a entrada
+    ``arquivo`` dele e o zip continua aberto após fechar().
+    """
+
+    def __init__(self, caminho, nome, kmz=None, arquivo='doc.kml'):
+        super().__init__(self, 0)
+        self._proprio = kmz is None
+        self._zip = EscritorZip(caminho) if kmz is None else kmz
+        self._arquivo = arquivo
+        self._cabecalho = f"{CABECALHO_KML}<Document><name>{escape(str(nome))}</name><open>1</open>"
+        self._corpo = tempfile.TemporaryFile()
+        self._compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._pendentes = []
+        self._tamanho_pendente = 0
+        self._crc = 0
+        self._tamanho = 0
+        self._abertas = 0
+        self._estilos = {}
+        self.peca = None
+
+    def _escrever(self, texto):
+        self._pendentes.append(texto)
+        self._tamanho_pendente += len(texto)
+        if self._tamanho_pendente >= TAMANHO_BUFFER_KML:
+            self._descarregar()
+
+    def _descarregar(self):
+        dados = "".join(self._pendentes).encode('utf-8')
+        self._pendentes, self._tamanho_pendente = [], 0
+        self._crc = zlib.crc32(dados, self._crc)
+        self._tamanho += len(dados)
+        self._corpo.write(self._compressor.compress(dados))
+
+    def _fechar_ate(self, nivel):
+        while self._abertas > nivel:
+            self._escrever("</Folder>")
+            self._abertas -= 1
+
+    def _estilo(self, cor, largura):
+        id_local = id_estilo(cor, largura)
+        self._estilos.setdefault(id_local, (cor, largura))
+        return f"#{id_local}"
+
+    def fechar(self):
+        if self._corpo.closed:
+            return
+        self._fechar_ate(0)
+        self._escrever("</Document></kml>")
+        self._descarregar()
+        self._corpo.write(self._compressor.flush())
+        comprimido = self._corpo.tell()
+        self._corpo.seek(0)
+        estilos = list(self._estilos.values())
+        deslocamento = self._zip.entrada(self._arquivo, self._cabecalho + kml_estilos(estilos), self._corpo,
+                                         comprimido, self._crc, self._tamanho)
+        self._corpo.close()
+        self.peca = {'arquivo': self._arquivo, 'cabecalho': self._cabecalho, 'estilos': estilos,
+                     'deslocamento': deslocamento, 'comprimido': comprimido, 'crc': self._crc,
+                     'tamanho': self._tamanho}
+        if self._proprio:
+            self._zip.fechar()
+
+    def descartar(self):
+        """Descarta o documento e fecha o zip sem completá-lo (após um erro)."""
+        if self._corpo.closed:
+            return
+        self._corpo.close()
+        if self._proprio:
+            self._zip.fechar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, *exc):
+        if tipo is None:
+            self.fechar()
+        else:
+            self.descartar()
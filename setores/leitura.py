@@ -0,0 +1,164 @@
+"""Leitura das exportações de licenciamento da Anatel (CSV/Excel).
+
+Só as colunas necessárias são lidas, com tipos explícitos. O Azimute chega
+como texto e a vírgula decimal é tratada de forma vetorizada na leitura.
+
+Planilhas são lidas com o calamine quando instalado (python-calamine) ou,
+sem ele, percorrendo as linhas do openpyxl em modo somente leitura. As
+colunas conhecidas (DTYPES) da primeira aba vão para um Parquet guardado
+pelo hash do arquivo; a mesma planilha, de novo, é lida dele sem abrir o
+Excel.
+"""
+import operator
+import os
+
+import pandas as pd
+
+from setores.cache import CacheDisco, diretorio_usuario, hash_arquivo
+
+REQUIRED_COLUMNS = ['Latitude', 'Longitude', 'Azimute', 'FreqTxMHz', 'NomeEntidade', 'NumEstacao', 'Tecnologia']
+DTYPES = {
+    'Latitude': 'float64',
+    'Longitude': 'float64',
+    'Azimute': 'str',
+    'FreqTxMHz': 'float64',
+    'NomeEntidade': 'str',
+    'NumEstacao': 'Int64',
+    'Tecnologia': 'str',
+    'SiglaUf': 'str',
+    'CodMunicipio': 'Int64',
+    'Municipio.NomeMunicipio': 'str',
+}
+EXTENSAO_TABELA = '.pkl'
+DIRETORIO_PLANILHAS = os.environ.get("SETORES_PLANILHAS_DIR", diretorio_usuario("setores_planilhas"))
+ARQUIVO_PLANILHA = "planilha.parquet"
+
+try:
+    import pyarrow
+    ENGINE_PADRAO = 'pyarrow'
+except ImportError:
+    pyarrow = None
+    ENGINE_PADRAO = 'c'
+
+try:
+    import python_calamine  # noqa: F401
+    ENGINE_EXCEL = 'calamine'
+except ImportError:
+    ENGINE_EXCEL = None
+
+
+def _nome(arquivo):
+    return str(getattr(arquivo, 'name', arquivo))
+
+
+def _colunas(extras):
+    return REQUIRED_COLUMNS + [col for col in extras if col not in REQUIRED_COLUMNS]
+
+
+def _verificar_colunas(colunas, extras=()):
+    if not all(col in colunas for col in _colunas(extras)):
+        raise ValueError("Planilha não possui todas as colunas necessárias.")
+
+
+def _normalizar(df, extras=()):
+    df = df[_colunas(extras)]
+    azimute = df['Azimute']
+    if not pd.api.types.is_float_dtype(azimute):
+        azimute = azimute.astype('str').str.replace(',', '.', regex=False).astype('float64')
+    df = df.assign(Azimute=azimute).dropna(subset=REQUIRED_COLUMNS)
+    return df.astype({'NumEstacao': 'int64'})
+
+
+def ler_csv(arquivo, engine=None, tamanho_bloco=None, sep=',', decimal='.', colunas_extras=()):
+    """Lê um CSV só com REQUIRED_COLUMNS (e colunas_extras); com tamanho_bloco a leitura é feita em blocos."""
+    colunas = _colunas(colunas_extras)
+    cabecalho = pd.read_csv(arquivo, nrows=0, sep=sep)
+    _verificar_colunas(cabecalho.columns, colunas_extras)
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    if engine is None:
+        engine = 'c' if tamanho_bloco else ENGINE_PADRAO
+    opcoes = dict(usecols=colunas, dtype=DTYPES, sep=sep, decimal=decimal, engine=engine)
+    if tamanho_bloco:
+        blocos = [_normalizar(bloco, colunas_extras)
+                  for bloco in pd.read_csv(arquivo, chunksize=tamanho_bloco, **opcoes)]
+        df = pd.concat(blocos, ignore_index=True) if blocos else _normalizar(cabecalho[colunas], colunas_extras)
+    else:
+        df = _normalizar(pd.read_csv(arquivo, **opcoes), colunas_extras)
+    return df.reset_index(drop=True)
+
+
+def _tipar(df):
+    """Aplica DTYPES às colunas lidas célula a célula (números de texto, textos de número)."""
+    tipos = {}
+    for coluna in df.columns:
+        tipo = DTYPES.get(coluna)
+        if tipo == 'str':
+            tipos[coluna] = df[coluna].astype('str').where(df[coluna].notna())
+        elif tipo is not None:
+            tipos[coluna] = pd.to_numeric(df[coluna]).astype(tipo)
+    return df.assign(**tipos)
+
+
+def _ler_xlsx_openpyxl(arquivo, colunas):
+    """Primeira aba em fluxo, convertendo só as células das colunas pedidas."""
+    import openpyxl
+
+    livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True, keep_links=False)
+    try:
+        linhas = livro.worksheets[0].iter_rows(values_only=True)
+        posicoes = {}
+        for i, nome in enumerate(next(linhas, ())):
+            if nome in colunas:
+                posicoes.setdefault(nome, i)
+        if not posicoes:
+            return pd.DataFrame()
+        pegar = operator.itemgetter(*posicoes.values())
+        largura = max(posicoes.values()) + 1
+        # Linhas com células vazias no fim podem vir mais curtas que o cabeçalho
+        registros = [pegar(linha) if len(linha) >= largura else pegar(linha + (None,) * largura)
+                     for linha in linhas]
+    finally:
+        livro.close()
+    if len(posicoes) == 1:
+        registros = [(valor,) for valor in registros]
+    return _tipar(pd.DataFrame.from_records(registros, columns=list(posicoes)))
+
+
+def _ler_planilha(arquivo, colunas):
+    if ENGINE_EXCEL is None and _nome(arquivo).lower().endswith(('.xlsx', '.xlsm')):
+        return _ler_xlsx_openpyxl(arquivo, colunas)
+    return pd.read_excel(arquivo, sheet_name=0, usecols=lambda col: col in colunas, dtype=DTYPES,
+                         engine=ENGINE_EXCEL)
+
+
+def ler_excel(arquivo, colunas_extras=(), diretorio_planilhas=DIRETORIO_PLANILHAS):
+    """Lê a primeira aba; com pyarrow e diretorio_planilhas, guarda e reaproveita o Parquet da planilha."""
+    colunas = _colunas(colunas_extras)
+    if pyarrow is None or diretorio_planilhas is None:
+        df = _ler_planilha(arquivo, colunas)
+    else:
+        import pyarrow.parquet as pq
+
+        # Todas as colunas conhecidas, para uma partição por UF ou município achar a sua no mesmo Parquet
+        conhecidas = sorted(set(DTYPES) | set(colunas))
+        cache = CacheDisco(diretorio_planilhas)
+        chave = CacheDisco.chave(hash_arquivo(arquivo), 'planilha', conhecidas)
+        with cache.uso():
+            entrada = cache.entrada(chave, lambda destino: _ler_planilha(arquivo, conhecidas).to_parquet(
+                os.path.join(destino, ARQUIVO_PLANILHA), index=False))
+            caminho = os.path.join(entrada, ARQUIVO_PLANILHA)
+            presentes = pq.read_schema(caminho).names
+            df = pd.read_parquet(caminho, columns=[col for col in colunas if col in presentes])
+    _verificar_colunas(df.columns, colunas_extras)
+    return _normalizar(df, colunas_extras).reset_index(drop=True)
+
+
+def ler_licenciamento(arquivo, engine=None, tamanho_bloco=None, colunas_extras=()):
+    """Lê CSV, Excel ou uma tabela já normalizada em pickle (.pkl, ver setores.lotes)."""
+    nome = _nome(arquivo).lower()
+    if nome.endswith(EXTENSAO_TABELA):
+        return pd.read_pickle(arquivo)
+    if nome.endswith('.csv'):
+        return ler_csv(arquivo, engine=engine, tamanho_bloco=tamanho_bloco, colunas_extras=colunas_extras)
+    return ler_excel(arquivo, colunas_extras=colunas_extras)
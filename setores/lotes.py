@@ -0,0 +1,63 @@
+"""Particionamento da exportação nacional por UF, município ou operadora.
+
+A planilha é lida uma vez; cada partição vira uma tabela já normalizada
+(.pkl) que ler_licenciamento() carrega direto, para ser gerada num
+processo separado. Com as partições maiores primeiro, nenhum processo
+fica sozinho com a maior delas no fim do lote.
+"""
+import os
+import re
+
+from setores.kml import escrever_rede
+from setores.leitura import EXTENSAO_TABELA, ler_licenciamento
+from setores.normalizacao import normalizar_entidades
+
+# Opção da linha de comando → coluna da planilha
+CHAVES_PARTICAO = {
+    'uf': 'SiglaUf',
+    'municipio': 'CodMunicipio',
+    'entidade': 'NomeEntidade',
+}
+SEM_VALOR = "sem_valor"
+
+
+def nome_particao(valor):
+    """Nome de arquivo seguro para o valor da chave."""
+    if valor is None or valor != valor:
+        return SEM_VALOR
+    return re.sub(r'[^\w.-]+', '_', str(valor)).strip('_') or SEM_VALOR
+
+
+def particionar(arquivo, chave, diretorio, tamanho_bloco=None):
+    """Grava uma tabela por valor da chave; retorna [(nome, caminho, linhas)], maiores primeiro.
+
+    Por entidade, a partição usa o mesmo nome normalizado (primeira palavra,
+    maiúscula) que aparece nas pastas do KMZ.
+    """
+    if chave not in CHAVES_PARTICAO:
+        raise ValueError(f"Chave de partição desconhecida: {chave}")
+    coluna = CHAVES_PARTICAO[chave]
+    df = ler_licenciamento(arquivo, tamanho_bloco=tamanho_bloco, colunas_extras=[coluna])
+    if chave == 'entidade':
+        valores = normalizar_entidades(df['NomeEntidade'])
+    else:
+        valores = df.pop(coluna)
+    particoes = []
+    for valor, grupo in df.groupby(valores, sort=True, dropna=False):
+        nome = nome_particao(valor)
+        caminho = os.path.join(diretorio, nome + EXTENSAO_TABELA)
+        grupo.reset_index(drop=True).to_pickle(caminho)
+        particoes.append((nome, caminho, len(grupo)))
+    particoes.sort(key=lambda particao: -particao[2])
+    return particoes
+
+
+def escrever_nacional(caminho, nome, kmz_particoes):
+    """KMZ com um NetworkLink para cada KMZ de partição do mesmo diretório."""
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    links = []
+    for kmz in sorted(kmz_particoes):
+        relativo = os.path.relpath(os.path.abspath(kmz), diretorio).replace(os.sep, '/')
+        links.append((os.path.splitext(os.path.basename(kmz))[0], "../" + relativo))
+    escrever_rede(caminho, nome, links)
+    return caminho
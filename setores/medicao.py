@@ -0,0 +1,136 @@
+"""Tempo e pico de memória de cada estágio da geração.
+
+Uma Medicao é passada a gerar() (ou processar_arquivo) e cada estágio roda
+dentro de medicao.estagio(nome). Estágios podem se aninhar (os vértices
+dos setores são calculados dentro das feições que os pedem); o tempo
+próprio desconta o dos filhos. A memória vem do tracemalloc, que inclui
+os arrays do NumPy e os blocos do pandas, mas deixa o código Python mais
+lento: com memoria=False só o tempo é medido.
+
+ao_avancar(estagio, feito, total, detalhe), se dado, é chamado no início de
+cada estágio e a cada medicao.avancar(); é por ele que a fila de tarefas
+(setores.tarefas) acompanha o progresso e interrompe uma tarefa cancelada.
+"""
+import contextlib
+import json
+import platform
+import time
+import tracemalloc
+
+MB = 1024 * 1024
+
+
+class Medicao:
+    """Registro dos estágios na ordem em que começaram, com anotações livres."""
+
+    def __init__(self, memoria=True, ao_avancar=None):
+        self.memoria = memoria
+        self.ao_avancar = ao_avancar
+        self.estagios = []
+        self.anotacoes = {}
+        self._abertos = []
+        self._iniciou_rastreio = False
+        self._inicio = None
+        self._total = None
+
+    def __enter__(self):
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._iniciou_rastreio = True
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self._total = time.perf_counter() - self._inicio
+        if self._iniciou_rastreio:
+            self.anotacoes.setdefault('pico_total_mb', tracemalloc.get_traced_memory()[1] / MB)
+            tracemalloc.stop()
+            self._iniciou_rastreio = False
+        return False
+
+    def anotar(self, **valores):
+        self.anotacoes.update(valores)
+
+    def avancar(self, feito, total, detalhe=None):
+        """Progresso dentro do estágio aberto mais interno (feito de total)."""
+        if self.ao_avancar is not None:
+            nome = self._abertos[-1]['estagio'] if self._abertos else None
+            self.ao_avancar(nome, feito, total, detalhe)
+
+    @contextlib.contextmanager
+    def estagio(self, nome):
+        if self.ao_avancar is not None:
+            self.ao_avancar(nome, 0, None, None)
+        medir_memoria = self.memoria and tracemalloc.is_tracing()
+        registro = {'estagio': nome, 'nivel': len(self._abertos), 'filhos_segundos': 0.0, 'pico': 0}
+        if medir_memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            if self._abertos:
+                # O pico do pai até aqui seria perdido com o reset
+                self._abertos[-1]['pico'] = max(self._abertos[-1]['pico'], pico)
+            tracemalloc.reset_peak()
+            registro['inicial'] = atual
+        # Entra na lista ao começar, para o relatório seguir a ordem de início
+        resultado = {'estagio': nome, 'nivel': registro['nivel']}
+        self.estagios.append(resultado)
+        self._abertos.append(registro)
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            segundos = time.perf_counter() - inicio
+            self._abertos.pop()
+            resultado['segundos'] = segundos
+            resultado['proprio_segundos'] = segundos - registro['filhos_segundos']
+            if medir_memoria:
+                pico = max(registro['pico'], tracemalloc.get_traced_memory()[1])
+                resultado['memoria_inicial_mb'] = registro['inicial'] / MB
+                resultado['pico_mb'] = pico / MB
+                resultado['acrescimo_mb'] = (pico - registro['inicial']) / MB
+                if self._abertos:
+                    self._abertos[-1]['pico'] = max(self._abertos[-1]['pico'], pico)
+            if self._abertos:
+                self._abertos[-1]['filhos_segundos'] += segundos
+
+    def resumo(self):
+        """Tempo próprio e maior pico por nome de estágio, somando as repetições."""
+        por_nome = {}
+        for registro in self.estagios:
+            if 'segundos' not in registro:
+                continue  # ainda aberto
+            soma = por_nome.setdefault(registro['estagio'], {'estagio': registro['estagio'], 'vezes': 0,
+                                                             'segundos': 0.0, 'proprio_segundos': 0.0})
+            soma['vezes'] += 1
+            soma['segundos'] += registro['segundos']
+            soma['proprio_segundos'] += registro['proprio_segundos']
+            if 'pico_mb' in registro:
+                soma['pico_mb'] = max(soma.get('pico_mb', 0.0), registro['pico_mb'])
+        return list(por_nome.values())
+
+    def relatorio(self):
+        import numpy as np
+        import pandas as pd
+
+        return {
+            'total_segundos': self._total,
+            'memoria_medida': self.memoria,
+            'anotacoes': self.anotacoes,
+            'resumo': self.resumo(),
+            'estagios': self.estagios,
+            'ambiente': {
+                'python': platform.python_version(),
+                'plataforma': platform.platform(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+            },
+        }
+
+    def salvar(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio(), f, ensure_ascii=False, indent=2, default=str)
+        return caminho
+
+
+def estagio(medicao, nome):
+    """medicao.estagio(nome), ou um contexto vazio sem medição."""
+    return medicao.estagio(nome) if medicao is not None else contextlib.nullcontext()
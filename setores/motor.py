@@ -0,0 +1,84 @@
+"""API de alto nível: arquivo de licenciamento → (KMZ, feições)."""
+from functools import partial
+
+from setores.faixas import TABELA_FAIXAS
+from setores.leitura import ler_licenciamento
+from setores.pipeline import gerar, gerar_indice
+
+DISTANCIA_KM = 1.5
+SETOR_ANGULO = 30
+RAIO_CIRCULO_METROS = 40
+OPACIDADE_PERCENTUAL = 60
+
+# Perfil → (distâncias por faixa a partir da tabela e da distância padrão, CRS das feições)
+PERFIS = {
+    'proporcional': (lambda tabela, distancia_km: tabela.distancias_por_fator(distancia_km), "EPSG:4326"),
+    'absoluto': (lambda tabela, distancia_km: tabela.distancias_por_faixa(), "EPSG:31983"),
+}
+
+
+def _perfil(perfil):
+    if perfil not in PERFIS:
+        raise ValueError(f"Perfil desconhecido: {perfil}")
+    return PERFIS[perfil]
+
+
+def processar_arquivo(input_file, distancia_km=DISTANCIA_KM, setor_angulo=SETOR_ANGULO,
+                      raio_circulo_metros=RAIO_CIRCULO_METROS, opacidade_percentual=OPACIDADE_PERCENTUAL,
+                      kml_continuo=False, formato_saida='geojson', tamanho_bloco=None, cache=None,
+                      perfil='proporcional', diretorio_trabalho=None, kml_regionado=False,
+                      tabela_faixas=TABELA_FAIXAS, coalescer=True, medicao=None, cobertura=False):
+    """Gera o KMZ e o arquivo de feições; retorna (caminho_kmz, caminho_feicoes).
+
+    perfil escolhe como a distância de cada faixa da tabela_faixas é obtida:
+    'proporcional' multiplica distancia_km pelos fatores da tabela, 'absoluto'
+    usa as distâncias da tabela e só cai em distancia_km fora dela. coalescer
+    junta as linhas que repetem o mesmo setor antes de gerar a geometria.
+    medicao (setores.medicao.Medicao) recebe o tempo e a memória de cada estágio.
+    cobertura acrescenta a união dos setores por entidade e faixa (ver setores.cobertura).
+    """
+    distancias, crs = _perfil(perfil)
+    return gerar(
+        input_file,
+        partial(ler_licenciamento, input_file, tamanho_bloco=tamanho_bloco),
+        distancia_km,
+        distancias(tabela_faixas, distancia_km),
+        setor_angulo,
+        raio_circulo_metros,
+        opacidade_percentual,
+        kml_continuo=kml_continuo,
+        formato_saida=formato_saida,
+        crs=crs,
+        cache=cache,
+        diretorio_trabalho=diretorio_trabalho,
+        kml_regionado=kml_regionado,
+        tabela_faixas=tabela_faixas,
+        coalescer=coalescer,
+        medicao=medicao,
+        cobertura=cobertura
+    )
+
+
+def indexar_arquivo(input_file, distancia_km=DISTANCIA_KM, setor_angulo=SETOR_ANGULO,
+                    raio_circulo_metros=RAIO_CIRCULO_METROS, tamanho_bloco=None, cache=None,
+                    perfil='proporcional', diretorio_trabalho=None, tabela_faixas=TABELA_FAIXAS,
+                    coalescer=True, medicao=None):
+    """Grava o índice espacial dos setores e círculos; retorna o caminho do .npz.
+
+    Com o mesmo cache e os mesmos parâmetros de processar_arquivo, reaproveita
+    a tabela e os vértices já calculados.
+    """
+    distancias, _ = _perfil(perfil)
+    return gerar_indice(
+        input_file,
+        partial(ler_licenciamento, input_file, tamanho_bloco=tamanho_bloco),
+        distancia_km,
+        distancias(tabela_faixas, distancia_km),
+        setor_angulo,
+        raio_circulo_metros,
+        cache=cache,
+        diretorio_trabalho=diretorio_trabalho,
+        tabela_faixas=tabela_faixas,
+        coalescer=coalescer,
+        medicao=medicao
+    )
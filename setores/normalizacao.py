@@ -0,0 +1,55 @@
+"""Coalescência das linhas repetidas da exportação de licenciamento.
+
+A Anatel repete o mesmo setor físico em várias linhas que só diferem no
+ato, no _id, na validade ou na portadora. Aqui essas linhas viram uma só
+por (entidade, estação, faixa, azimute, tecnologia), antes de qualquer
+geometria ser calculada. O nome da entidade é reduzido à operadora.
+"""
+import numpy as np
+import pandas as pd
+
+from setores.agrupamento import COLUNA_FREQ_ESTACAO
+
+CHAVES_SETOR = ['NomeEntidade', 'NumEstacao', 'Faixa', 'Azimute', 'Tecnologia']
+SEPARADOR_PORTADORAS = "; "
+
+
+def normalizar_entidades(nomes):
+    """Nome da operadora pela primeira palavra, em maiúsculas (ex.: "Claro S.A." → "CLARO")."""
+    return nomes.str.split().str[0].str.upper()
+
+
+def coalescer_setores(df, tabela_faixas):
+    """Uma linha por setor, na ordem da primeira aparição.
+
+    FreqTxMHz passa a ser a menor portadora do próprio setor, e a coluna
+    Portadoras lista as frequências dele. A coluna COLUNA_FREQ_ESTACAO (a
+    menor portadora da estação na faixa) põe todos os setores da faixa na
+    mesma pasta e com um só círculo.
+    """
+    df = df.assign(Faixa=tabela_faixas.classificar(df['FreqTxMHz'].to_numpy()).astype(float))
+    grupo = df.groupby(CHAVES_SETOR, sort=False, dropna=False).ngroup().to_numpy()
+    portadoras = (
+        pd.DataFrame({'grupo': grupo, 'freq': df['FreqTxMHz'].to_numpy()})
+        .drop_duplicates()
+        .sort_values(['grupo', 'freq'])
+    )
+    grupos = portadoras['grupo'].to_numpy()
+    freqs = portadoras['freq'].to_numpy()
+    inicio = np.diff(grupos, prepend=-1) != 0
+    posicao = np.arange(len(grupos)) - np.flatnonzero(inicio)[np.cumsum(inicio) - 1]
+    textos = freqs.astype(str).astype(object)
+    # Ordenadas por grupo e frequência, a primeira portadora de cada grupo é a menor; as
+    # demais entram uma posição por vez, sem um join em Python por setor
+    menor = freqs[inicio]
+    juntas = textos[inicio]
+    for k in range(1, posicao.max() + 1 if len(posicao) else 1):
+        na_posicao = posicao == k
+        juntas[grupos[na_posicao]] = juntas[grupos[na_posicao]] + SEPARADOR_PORTADORAS + textos[na_posicao]
+    representante = df.groupby(['NomeEntidade', 'NumEstacao', 'Faixa'], sort=False)['FreqTxMHz'].transform('min')
+    primeiras = np.flatnonzero(~pd.Series(grupo).duplicated().to_numpy())
+    resultado = df.assign(**{COLUNA_FREQ_ESTACAO: representante}).iloc[primeiras].drop(columns='Faixa')
+    # ngroup numera os grupos por ordem de aparição: a i-ésima primeira linha é do grupo i
+    resultado['FreqTxMHz'] = menor
+    resultado['Portadoras'] = juntas
+    return resultado.reset_index(drop=True)
@@ -0,0 +1,452 @@
+"""Geração em estágios: leitura, geometria, serialização e estilo.
+
+Cada estágio tem uma chave própria no cache, formada só pelo que ele usa:
+a opacidade entra apenas no estilo do KMZ, o raio apenas nos círculos e o
+formato apenas nas feições. Mudar um parâmetro refaz só os estágios que
+dependem dele, e a tabela só é carregada se algum estágio precisar dela.
+"""
+import contextlib
+import json
+import os
+import tempfile
+from functools import cached_property, lru_cache
+
+import numpy as np
+import pandas as pd
+
+from setores.agrupamento import chaves_estacao, hierarquia_estacoes
+from setores.cache import CacheDisco, hash_arquivo
+from setores.cobertura import dissolver, poligonos_kml
+from setores.estilos import cor_operadora, cores_frequencias
+from setores.faixas import TABELA_FAIXAS
+from setores.geometria import calcular_setores, gerar_circulos
+from setores.indice import ARQUIVO_INDICE, IndiceCobertura
+from setores.kml import abrir_kmz, aplicar_estilos
+from setores.medicao import estagio
+from setores.normalizacao import coalescer_setores, normalizar_entidades
+from setores.regioes import escrever_regioes, montar_quadtree
+from setores.saida import CAMPOS, abrir_saida, caminho_saida
+
+NOME_DOCUMENTO = "Setores de Estações"
+OUTPUT_KMZ = "setores_estacoes.kmz"
+OUTPUT_GEOJSON = "setores_estacoes.geojson"
+ARQUIVO_VERTICES = "vertices.npy"
+ARQUIVO_KMZ_BASE = "base.kmz"
+ARQUIVO_PECAS = "pecas.json"
+ALPHA_BASE = 255
+
+
+def alpha_opacidade(opacidade_percentual):
+    return int((opacidade_percentual / 100) * 255)
+
+
+class Estacoes:
+    """Dados por linha derivados da tabela, comuns a todos os estágios."""
+
+    def __init__(self, df, tabela_faixas=TABELA_FAIXAS):
+        self.chaves = chaves_estacao(df)
+        grupos_estacao = df.groupby(self.chaves, sort=False)
+        self.df = df
+        self.tabela_faixas = tabela_faixas
+        self.lat = grupos_estacao['Latitude'].transform('first').to_numpy(dtype=float)
+        self.lon = grupos_estacao['Longitude'].transform('first').to_numpy(dtype=float)
+        self.azimutes = df['Azimute'].to_numpy()
+        self.freqs = df['FreqTxMHz'].to_numpy()
+        # Frequência da pasta e do círculo; com os setores coalescidos, a menor da estação na faixa
+        self.freqs_estacao = df[self.chaves[1]].to_numpy()
+        self.tecnologias = df['Tecnologia'].to_numpy()
+        self.faixa_por_freq = tabela_faixas.por_frequencia(self.freqs)
+        # Só existe quando as linhas repetidas foram coalescidas (ver setores.normalizacao)
+        self.portadoras = df['Portadoras'].to_numpy() if 'Portadoras' in df else None
+        self.primeiras = np.flatnonzero(~df.duplicated(self.chaves).to_numpy())
+        self.indice_circulo = np.full(len(df), -1)
+        self.indice_circulo[self.primeiras] = np.arange(len(self.primeiras))
+
+
+class _Execucao:
+    def __init__(self, arquivo, ler, cache, diretorio_trabalho=None, tabela_faixas=TABELA_FAIXAS, coalescer=False,
+                 medicao=None):
+        self.cache = cache
+        self.medicao = medicao
+        self.tabela_faixas = tabela_faixas
+        self.coalescer = coalescer
+        self._ler = ler
+        self._hash = hash_arquivo(arquivo) if cache is not None else None
+        self._temporario = None
+        if cache is None:
+            self._temporario = diretorio_trabalho or tempfile.mkdtemp()
+        self._uso = contextlib.nullcontext() if cache is None else cache.uso()
+
+    def __enter__(self):
+        # As entradas desta execução só podem sair do cache depois que ela termina
+        self._uso.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._uso.__exit__(*exc)
+
+    def chave(self, *partes):
+        return CacheDisco.chave(self._hash, *partes)
+
+    def medir(self, nome):
+        return estagio(self.medicao, nome)
+
+    @property
+    def avancar(self):
+        return self.medicao.avancar if self.medicao is not None else None
+
+    @cached_property
+    def estacoes(self):
+        with self.medir('leitura'):
+            if self.cache is None:
+                df = self._ler()
+            else:
+                df = self.cache.tabela(self.chave('tabela'), self._ler)
+        linhas_lidas = len(df)
+        with self.medir('normalizacao'):
+            df['NomeEntidade'] = normalizar_entidades(df['NomeEntidade'])
+            if self.coalescer:
+                df = coalescer_setores(df, self.tabela_faixas)
+        with self.medir('estacoes'):
+            est = Estacoes(df, self.tabela_faixas)
+        if self.medicao is not None:
+            self.medicao.anotar(linhas_lidas=linhas_lidas, setores=len(df), estacoes=len(est.primeiras))
+        return est
+
+    def entrada(self, chave, produzir):
+        if self.cache is not None:
+            return self.cache.entrada(chave, produzir)
+        destino = os.path.join(self._temporario, chave)
+        os.makedirs(destino)
+        produzir(destino)
+        return destino
+
+    def vertices(self, chave, calcular):
+        if self.cache is None:
+            return calcular()
+        entrada = self.entrada(chave, lambda d: np.save(os.path.join(d, ARQUIVO_VERTICES), calcular()))
+        return np.load(os.path.join(entrada, ARQUIVO_VERTICES))
+
+
+# --- GEOMETRIA ---
+def _setores(est, distancia_km, distancias_faixa, setor_angulo):
+    distancias = est.tabela_faixas.distancias_setor(est.freqs, distancias_faixa, distancia_km)
+    return calcular_setores(est.lat, est.lon, est.azimutes, distancias, setor_angulo)
+
+
+def _circulos(est, raio_circulo_metros):
+    return gerar_circulos(est.lat[est.primeiras], est.lon[est.primeiras], raio_circulo_metros)
+
+
+def _estagios_geometria(ex, distancia_km, distancias_faixa, setor_angulo, raio_circulo_metros):
+    """Chaves e leitores (carregam do cache ou calculam) dos vértices de setores e círculos."""
+    chave_setores = ex.chave('setores', distancia_km, sorted(distancias_faixa.items()), setor_angulo,
+                             ex.tabela_faixas.chave(), ex.coalescer)
+    chave_circulos = ex.chave('circulos', raio_circulo_metros, ex.tabela_faixas.chave(), ex.coalescer)
+
+    def setores():
+        with ex.medir('setores'):
+            return ex.vertices(chave_setores,
+                               lambda: _setores(ex.estacoes, distancia_km, distancias_faixa, setor_angulo))
+
+    def circulos():
+        with ex.medir('circulos'):
+            return ex.vertices(chave_circulos, lambda: _circulos(ex.estacoes, raio_circulo_metros))
+
+    return chave_setores, chave_circulos, setores, circulos
+
+
+def _estagio_cobertura(ex, chave_setores, setores):
+    """Leitor da cobertura dissolvida por entidade e faixa (ver setores.cobertura)."""
+    import shapely
+
+    def calcular():
+        est = ex.estacoes
+        return dissolver(est.df['NomeEntidade'].to_numpy(), est.tabela_faixas.classificar(est.freqs), setores())
+
+    def calcular_wkb():
+        df = calcular()
+        # Faixas fora da tabela são a própria frequência (float), as outras são int; em JSON não viram float
+        return df.assign(geometria=shapely.to_wkb(df['geometria'].to_numpy()), Faixa=df['Faixa'].map(json.dumps))
+
+    # Feições e KMZ pedem a mesma cobertura; sem cache em disco, ela seria dissolvida duas vezes
+    @lru_cache(maxsize=None)
+    def cobertura():
+        with ex.medir('cobertura'):
+            if ex.cache is None:
+                return calcular()
+            # No Parquet do cache as geometrias vão como WKB
+            df = ex.cache.tabela(ex.chave(chave_setores, 'cobertura'), calcular_wkb)
+            return df.assign(geometria=shapely.from_wkb(df['geometria'].to_numpy()),
+                             Faixa=np.array([json.loads(faixa) for faixa in df['Faixa']], dtype=object))
+
+    return cobertura
+
+
+def construir_indice(est, vertices_setores, raio_circulo_metros):
+    """IndiceCobertura com um polígono por setor e um círculo por estação."""
+    df = est.df
+    faixa = est.tabela_faixas.classificar(est.freqs).astype(float)
+    setores = pd.DataFrame({
+        'Tipo': 'Setor',
+        'NomeEntidade': df['NomeEntidade'],
+        'NumEstacao': df['NumEstacao'],
+        'FreqTxMHz': df['FreqTxMHz'],
+        'Faixa': faixa,
+        'Azimute': df['Azimute'],
+        'Tecnologia': df['Tecnologia'],
+    })
+    estacoes = setores.iloc[est.primeiras].assign(Tipo='Estação Base', Azimute=np.nan,
+                                                   FreqTxMHz=est.freqs_estacao[est.primeiras])
+    atributos = pd.concat([setores, estacoes], ignore_index=True)
+    centros = np.column_stack([est.lon[est.primeiras], est.lat[est.primeiras]])
+    return IndiceCobertura(vertices_setores, centros, raio_circulo_metros, atributos)
+
+
+# --- SERIALIZAÇÃO ---
+def _total_entidades(est, avancar):
+    return est.df['NomeEntidade'].nunique() if avancar is not None else 0
+
+
+def escrever_cobertura(kml, cobertura, alpha):
+    """Pasta "Cobertura" com um multipolígono por entidade e faixa, na cor da faixa."""
+    pasta = kml.newfolder(name="Cobertura")
+    cores = cores_frequencias(cobertura['Faixa'].to_numpy(dtype=float), alpha)
+    pasta_entidade, entidade = None, None
+    for linha, cor in zip(cobertura.itertuples(index=False), cores):
+        if linha.NomeEntidade != entidade:
+            entidade = linha.NomeEntidade
+            pasta_entidade = pasta.newfolder(name=str(entidade))
+        pasta_entidade.multipoligono(
+            f"Cobertura {linha.Faixa} MHz - {entidade}",
+            f"Entidade: {entidade}, Faixa: {linha.Faixa} MHz, Setores: {linha.Setores}",
+            poligonos_kml(linha.geometria),
+            cor,
+            1.0
+        )
+
+
+def escrever_kmz(kml, est, vertices_setores, vertices_circulos, alpha, avancar=None, cobertura=None):
+    """avancar(feito, total, detalhe), se dado, é chamado a cada entidade e faixa.
+
+    cobertura (ver setores.cobertura.dissolver), se dada, vai numa pasta antes das entidades.
+    """
+    cores = cores_frequencias(est.freqs, alpha)
+    total = _total_entidades(est, avancar)
+    # Com um erro (ou uma tarefa cancelada) o KMZ é descartado em vez de fechado
+    with kml:
+        if cobertura is not None:
+            escrever_cobertura(kml, cobertura, alpha)
+        for n, (nome_entidade, frequencias) in enumerate(hierarquia_estacoes(est.df)):
+            pasta_entidade = kml.newfolder(name=str(nome_entidade))
+            for freq, estacoes in frequencias:
+                faixa = est.faixa_por_freq[freq]
+                if avancar is not None:
+                    avancar(n, total, f"{nome_entidade}, {faixa} MHz")
+                pasta_freq = pasta_entidade.newfolder(name=f"Frequência {faixa} MHz")
+                for estacao_id, linhas in estacoes:
+                    primeira = linhas[0]
+                    pasta_estacao = pasta_freq.newfolder(name=f"Estação {estacao_id}")
+                    pasta_estacao.poligono(
+                        f"Estação {estacao_id}",
+                        f"Marcador da Estação Base: {nome_entidade}",
+                        vertices_circulos[est.indice_circulo[primeira]].tolist(),
+                        cor_operadora(nome_entidade, alpha),
+                        0
+                    )
+                    for i in linhas:
+                        az = est.azimutes[i]
+                        freq_row = est.freqs[i]
+                        tecnologia = est.tecnologias[i]
+                        alt = 0
+                        descricao = f"Entidade: {nome_entidade}, Estação: {estacao_id}, Frequência: {freq_row} MHz, Tecnologia: {tecnologia}"
+                        if est.portadoras is not None:
+                            descricao += f", Portadoras: {est.portadoras[i]} MHz"
+                        pasta_estacao.poligono(
+                            f"Setor {az}° - {freq_row} MHz - {tecnologia} - {nome_entidade}",
+                            descricao,
+                            [(x, y, alt) for x, y in vertices_setores[i].tolist()],
+                            cores[i],
+                            1.0
+                        )
+
+
+def _contar_folhas(quadro):
+    return sum(_contar_folhas(filho) for filho in quadro.filhos) if quadro.filhos else 1
+
+
+def escrever_kmz_regionado(caminho, est, vertices_setores, vertices_circulos, alpha, avancar=None,
+                           cobertura=None):
+    """KMZ em quadtree (ver setores.regioes); retorna as peças de cada quadro para aplicar_estilos().
+
+    avancar(feito, total, detalhe), se dado, é chamado a cada folha; a
+    cobertura, se dada, fica no documento raiz.
+    """
+    n = len(est.primeiras)
+    if n == 0:
+        # Sem estações não há quadtree: só o documento raiz, sem quadros
+        with abrir_kmz(caminho, NOME_DOCUMENTO, continuo=True) as kml:
+            if cobertura is not None:
+                escrever_cobertura(kml, cobertura, alpha)
+        return [kml.peca]
+    estacao_linha = est.df.groupby(est.chaves, sort=False).ngroup().to_numpy()
+    extensoes = np.hstack([vertices_circulos.min(axis=1), vertices_circulos.max(axis=1)])
+    for eixo in range(2):
+        np.minimum.at(extensoes[:, eixo], estacao_linha, vertices_setores[:, :, eixo].min(axis=1))
+        np.maximum.at(extensoes[:, eixo + 2], estacao_linha, vertices_setores[:, :, eixo].max(axis=1))
+    ordem = np.argsort(estacao_linha, kind='stable')
+    limites = np.r_[0, np.cumsum(np.bincount(estacao_linha, minlength=n))]
+
+    folhas = [0]
+
+    def escrever_folha(kml, estacoes):
+        if avancar is not None:
+            avancar(folhas[0], total_folhas, f"{len(estacoes)} estações")
+            folhas[0] += 1
+        estacoes = np.sort(estacoes)
+        linhas = np.sort(np.concatenate([ordem[limites[e]:limites[e + 1]] for e in estacoes]))
+        sub = Estacoes(est.df.iloc[linhas].reset_index(drop=True), est.tabela_faixas)
+        escrever_kmz(kml, sub, vertices_setores[linhas], vertices_circulos[estacoes], alpha)
+
+    primeiras = est.df.iloc[est.primeiras]
+    rotulos = [f"Estação {estacao_id}" for estacao_id in primeiras['NumEstacao']]
+    descricoes = [f"Entidade: {nome}, Frequência: {freq} MHz"
+                  for nome, freq in zip(primeiras['NomeEntidade'], est.freqs_estacao[est.primeiras])]
+    lon, lat = est.lon[est.primeiras], est.lat[est.primeiras]
+    raiz = montar_quadtree(lon, lat, extensoes)
+    total_folhas = _contar_folhas(raiz)
+    escrever_raiz = None
+    if cobertura is not None:
+        def escrever_raiz(kml):
+            escrever_cobertura(kml, cobertura, alpha)
+    return escrever_regioes(caminho, NOME_DOCUMENTO, raiz, lon, lat, rotulos, descricoes, escrever_folha,
+                            escrever_raiz)
+
+
+def escrever_feicoes(saida, est, vertices_setores, avancar=None, cobertura=None):
+    total = _total_entidades(est, avancar)
+    for n, (nome_entidade, frequencias) in enumerate(hierarquia_estacoes(est.df)):
+        for freq, estacoes in frequencias:
+            if avancar is not None:
+                avancar(n, total, f"{nome_entidade}, {est.faixa_por_freq[freq]} MHz")
+            for estacao_id, linhas in estacoes:
+                primeira = linhas[0]
+                saida.ponto(est.lon[primeira], est.lat[primeira], {
+                    "NomeEntidade": nome_entidade,
+                    "NumEstacao": estacao_id,
+                    "Tipo": "Estação Base",
+                    "FreqTxMHz": freq
+                })
+                for i in linhas:
+                    alt = 0
+                    saida.poligono([(x, y, alt) for x, y in vertices_setores[i].tolist()], {
+                        "NomeEntidade": nome_entidade,
+                        "NumEstacao": estacao_id,
+                        "Azimute": est.azimutes[i],
+                        "FreqTxMHz": est.freqs[i],
+                        "Tecnologia": est.tecnologias[i],
+                        "Tipo": "Setor",
+                        "Portadoras": est.portadoras[i] if est.portadoras is not None else None
+                    })
+    if cobertura is not None:
+        for linha in cobertura.itertuples(index=False):
+            saida.geometria(linha.geometria, {
+                "NomeEntidade": linha.NomeEntidade,
+                "Tipo": "Cobertura",
+                "Faixa": linha.Faixa,
+                "Setores": linha.Setores
+            })
+    saida.fechar()
+
+
+# --- ORQUESTRAÇÃO ---
+def gerar(arquivo, ler, distancia_km, distancias_faixa, setor_angulo, raio_circulo_metros, opacidade_percentual,
+          kml_continuo=False, formato_saida='geojson', crs="EPSG:4326", cache=None, diretorio_trabalho=None,
+          kml_regionado=False, tabela_faixas=TABELA_FAIXAS, coalescer=False, medicao=None, cobertura=False):
+    """Gera (caminho_kmz, caminho_feicoes) refazendo só os estágios cujas chaves mudaram.
+
+    ler() devolve a tabela do arquivo; distancias_faixa mapeia faixa → km,
+    com distancia_km para as faixas fora dele. Sem cache, os arquivos vão
+    para diretorio_trabalho (ou um diretório temporário novo). kml_regionado
+    grava o KMZ em quadtree com níveis de detalhe, também com estilos trocáveis.
+    tabela_faixas classifica as frequências (ver setores.faixas); coalescer
+    junta as linhas repetidas de um mesmo setor (ver setores.normalizacao).
+    Com uma medicao (ver setores.medicao), cada estágio é cronometrado.
+    cobertura acrescenta ao KMZ e às feições a união dos setores de cada
+    entidade e faixa (ver setores.cobertura).
+    """
+    with _Execucao(arquivo, ler, cache, diretorio_trabalho, tabela_faixas, coalescer, medicao) as ex:
+        alpha = alpha_opacidade(opacidade_percentual)
+        chave_setores, chave_circulos, setores, circulos = _estagios_geometria(
+            ex, distancia_km, distancias_faixa, setor_angulo, raio_circulo_metros
+        )
+        dissolvida = _estagio_cobertura(ex, chave_setores, setores) if cobertura else lambda: None
+
+        def produzir_feicoes(destino):
+            caminho = caminho_saida(os.path.join(destino, OUTPUT_GEOJSON), formato_saida)
+            campos = CAMPOS + ['Portadoras'] if coalescer else CAMPOS
+            if cobertura:
+                campos = campos + ['Faixa', 'Setores']
+            escrever_feicoes(abrir_saida(caminho, formato_saida, crs=crs, campos=campos), ex.estacoes, setores(),
+                             ex.avancar, dissolvida())
+
+        with ex.medir('feicoes'):
+            entrada_feicoes = ex.entrada(ex.chave(chave_setores, 'feicoes', formato_saida, crs, cobertura),
+                                         produzir_feicoes)
+        caminho_feicoes = caminho_saida(os.path.join(entrada_feicoes, OUTPUT_GEOJSON), formato_saida)
+
+        if kml_continuo or kml_regionado:
+            # O corpo do KMZ não depende da opacidade: só o início de cada documento, com os estilos, é refeito
+            def produzir_base(destino):
+                caminho = os.path.join(destino, ARQUIVO_KMZ_BASE)
+                if kml_regionado:
+                    pecas = escrever_kmz_regionado(caminho, ex.estacoes, setores(), circulos(), ALPHA_BASE, ex.avancar,
+                                                   dissolvida())
+                else:
+                    kml = abrir_kmz(caminho, NOME_DOCUMENTO, continuo=True)
+                    escrever_kmz(kml, ex.estacoes, setores(), circulos(), ALPHA_BASE, ex.avancar, dissolvida())
+                    pecas = [kml.peca]
+                with open(os.path.join(destino, ARQUIVO_PECAS), 'w', encoding='utf-8') as f:
+                    json.dump(pecas, f)
+
+            chave_base = ex.chave(chave_setores, chave_circulos, 'kmz-regioes' if kml_regionado else 'kmz-base',
+                                  cobertura, ARQUIVO_PECAS)
+            with ex.medir('kmz-regioes' if kml_regionado else 'kmz-base'):
+                entrada_base = ex.entrada(chave_base, produzir_base)
+
+            def produzir_kmz(destino):
+                with open(os.path.join(entrada_base, ARQUIVO_PECAS), encoding='utf-8') as f:
+                    pecas = json.load(f)
+                aplicar_estilos(os.path.join(entrada_base, ARQUIVO_KMZ_BASE), os.path.join(destino, OUTPUT_KMZ),
+                                pecas, alpha)
+
+            with ex.medir('estilos'):
+                entrada_kmz = ex.entrada(ex.chave(chave_base, alpha), produzir_kmz)
+        else:
+            def produzir_kmz(destino):
+                kml = abrir_kmz(os.path.join(destino, OUTPUT_KMZ), NOME_DOCUMENTO)
+                escrever_kmz(kml, ex.estacoes, setores(), circulos(), alpha, ex.avancar, dissolvida())
+
+            with ex.medir('kmz'):
+                entrada_kmz = ex.entrada(ex.chave(chave_setores, chave_circulos, 'kmz', alpha, cobertura), produzir_kmz)
+        return os.path.join(entrada_kmz, OUTPUT_KMZ), caminho_feicoes
+
+
+def gerar_indice(arquivo, ler, distancia_km, distancias_faixa, setor_angulo, raio_circulo_metros,
+                 cache=None, diretorio_trabalho=None, tabela_faixas=TABELA_FAIXAS, coalescer=False, medicao=None):
+    """Grava o índice espacial (ver setores.indice) e devolve o caminho do .npz.
+
+    Usa as mesmas chaves de geometria de gerar(): com cache, os vértices já
+    calculados para o KMZ não são refeitos.
+    """
+    with _Execucao(arquivo, ler, cache, diretorio_trabalho, tabela_faixas, coalescer, medicao) as ex:
+        chave_setores, chave_circulos, setores, _ = _estagios_geometria(
+            ex, distancia_km, distancias_faixa, setor_angulo, raio_circulo_metros
+        )
+
+        def produzir_indice(destino):
+            construir_indice(ex.estacoes, setores(), raio_circulo_metros).salvar(os.path.join(destino, ARQUIVO_INDICE))
+
+        with ex.medir('indice'):
+            entrada = ex.entrada(ex.chave(chave_setores, chave_circulos, 'indice'), produzir_indice)
+        return os.path.join(entrada, ARQUIVO_INDICE)
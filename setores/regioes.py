@@ -0,0 +1,116 @@
+"""KMZ regionalizado: quadtree de estações com Region/Lod e NetworkLinks.
+
+Cada quadro da árvore é um KML próprio dentro do KMZ. Os quadros internos
+mostram só um resumo (marcadores das estações ou, se forem muitas, as
+células filhas com a contagem) e apontam para os filhos por NetworkLinks
+que o cliente só carrega quando a região deles aparece grande o bastante
+na tela. Setores e círculos ficam apenas nas folhas.
+"""
+import numpy as np
+
+from setores.kml import EscritorZip, KmzContinuo
+
+MAX_ESTACOES_QUADRO = 256
+MAX_MARCADORES = 2000
+PROFUNDIDADE_MAXIMA = 16
+LOD_MIN_PIXELS = 128
+# O filho tem metade do lado do pai: o resumo some quando os filhos começam a aparecer
+LOD_MAX_RESUMO = 2 * LOD_MIN_PIXELS
+COR_COBERTURA = "ff00a5ff"
+PREFIXO_QUADRO = "q"
+
+
+class Quadro:
+    """Nó da quadtree: estações (índices), caixa das geometrias e filhos."""
+
+    def __init__(self, chave, estacoes, caixa, filhos=()):
+        self.chave = chave
+        self.estacoes = estacoes
+        self.caixa = caixa
+        self.filhos = list(filhos)
+
+    @property
+    def arquivo(self):
+        return f"{PREFIXO_QUADRO}{self.chave}.kml"
+
+
+def _caixa(extensoes):
+    return (float(extensoes[:, 0].min()), float(extensoes[:, 1].min()),
+            float(extensoes[:, 2].max()), float(extensoes[:, 3].max()))
+
+
+def montar_quadtree(lon, lat, extensoes, max_estacoes=MAX_ESTACOES_QUADRO, profundidade_maxima=PROFUNDIDADE_MAXIMA):
+    """Divide as estações em quadrantes até cada folha ter no máximo max_estacoes.
+
+    extensoes é (n, 4) com oeste, sul, leste, norte das geometrias de cada
+    estação; a Region de um quadro cobre tudo o que ele e os filhos desenham.
+    """
+    def dividir(chave, indices, celula, profundidade):
+        caixa = _caixa(extensoes[indices])
+        if len(indices) <= max_estacoes or profundidade >= profundidade_maxima:
+            return Quadro(chave, indices, caixa)
+        oeste, sul, leste, norte = celula
+        meio_lon, meio_lat = (oeste + leste) / 2, (sul + norte) / 2
+        quadrante = (lat[indices] >= meio_lat) * 2 + (lon[indices] >= meio_lon)
+        celulas = [(oeste, sul, meio_lon, meio_lat), (meio_lon, sul, leste, meio_lat),
+                   (oeste, meio_lat, meio_lon, norte), (meio_lon, meio_lat, leste, norte)]
+        filhos = [
+            dividir(chave + str(q), indices[quadrante == q], celulas[q], profundidade + 1)
+            for q in range(4) if np.any(quadrante == q)
+        ]
+        return Quadro(chave, indices, caixa, filhos)
+
+    indices = np.arange(len(lon))
+    celula = (float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max()))
+    return dividir("", indices, celula, 0)
+
+
+def _resumo(kml, quadro, lon, lat, rotulos, descricoes):
+    pasta = kml.newfolder(name="Resumo")
+    pasta.regiao(quadro.caixa, 0 if not quadro.chave else LOD_MIN_PIXELS, LOD_MAX_RESUMO)
+    if len(quadro.estacoes) <= MAX_MARCADORES:
+        for i in quadro.estacoes:
+            pasta.ponto(rotulos[i], descricoes[i], lon[i], lat[i])
+        return
+    for filho in quadro.filhos:
+        oeste, sul, leste, norte = filho.caixa
+        pasta.poligono(
+            f"{len(filho.estacoes)} estações",
+            f"Quadro {PREFIXO_QUADRO}{filho.chave}: {len(filho.estacoes)} estações",
+            [(oeste, sul), (leste, sul), (leste, norte), (oeste, norte), (oeste, sul)],
+            COR_COBERTURA,
+            1.0
+        )
+
+
+def escrever_regioes(caminho, nome, raiz, lon, lat, rotulos, descricoes, escrever_folha, escrever_raiz=None):
+    """Grava o KMZ regionalizado; retorna a peça (ver KmzContinuo) de cada quadro.
+
+    escrever_folha(kml, estacoes) preenche uma folha com o detalhe das
+    estações dadas e fecha o documento. escrever_raiz(kml), se dado, põe no
+    documento raiz o que deve aparecer em qualquer zoom. Cada quadro traz os
+    seus estilos, que aplicar_estilos() troca depois.
+    """
+    pecas = []
+    with EscritorZip(caminho) as kmz:
+        pendentes = [raiz]
+        while pendentes:
+            quadro = pendentes.pop()
+            arquivo = 'doc.kml' if quadro is raiz else quadro.arquivo
+            kml = KmzContinuo(None, nome if quadro is raiz else f"Quadro {PREFIXO_QUADRO}{quadro.chave}",
+                              kmz=kmz, arquivo=arquivo)
+            # Fecha o quadro também quando a folha já o fechou; com erro, só descarta
+            with kml:
+                if not quadro.filhos:
+                    kml.regiao(quadro.caixa, 0 if quadro is raiz else LOD_MIN_PIXELS)
+                if quadro is raiz and escrever_raiz is not None:
+                    escrever_raiz(kml)
+                if not quadro.filhos:
+                    escrever_folha(kml, quadro.estacoes)
+                else:
+                    _resumo(kml, quadro, lon, lat, rotulos, descricoes)
+                    for filho in quadro.filhos:
+                        kml.link(f"Quadro {PREFIXO_QUADRO}{filho.chave}", filho.arquivo, filho.caixa, LOD_MIN_PIXELS)
+                    pendentes.extend(reversed(quadro.filhos))
+            pecas.append(kml.peca)
+    return pecas
@@ -0,0 +1,210 @@
+"""Camada de saída das feições (estações e setores).
+
+GeoJSON é gravado direto dos vértices, feição a feição, com orjson quando
+disponível. FlatGeobuf (com índice espacial) e GeoParquet montam as
+geometrias de uma vez no fechamento, via shapely/geopandas; PMTiles e
+MBTiles também, e daí cortam os tiles vetoriais (ver setores.tiles).
+Além de ponto() e poligono(), geometria() grava uma geometria shapely
+pronta, como as coberturas dissolvidas (ver setores.cobertura).
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CAMPOS = ['NomeEntidade', 'NumEstacao', 'Tipo', 'FreqTxMHz', 'Azimute', 'Tecnologia']
+EXTENSOES = {'geojson': '.geojson', 'fgb': '.fgb', 'parquet': '.parquet', 'pmtiles': '.pmtiles',
+             'mbtiles': '.mbtiles'}
+ROTULOS = {'geojson': 'GeoJSON', 'fgb': 'FlatGeobuf', 'parquet': 'GeoParquet', 'pmtiles': 'PMTiles',
+           'mbtiles': 'MBTiles'}
+# Origem de cada feição nos escritores colunares
+PONTO, POLIGONO, GEOMETRIA = 0, 1, 2
+
+
+def abrir_saida(caminho, formato='geojson', crs="EPSG:4326", campos=CAMPOS):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de saída desconhecido: {formato}")
+    return FORMATOS[formato](caminho, crs, campos)
+
+
+def caminho_saida(base, formato):
+    return os.path.splitext(base)[0] + EXTENSOES[formato]
+
+
+def _numpy_para_python(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, default=_numpy_para_python).encode('utf-8')
+
+
+def _urn_crs(crs):
+    if crs.upper() in ("EPSG:4326", "OGC:CRS84"):
+        return "urn:ogc:def:crs:OGC:1.3:CRS84"
+    autoridade, codigo = crs.split(":")
+    return f"urn:ogc:def:crs:{autoridade.upper()}::{codigo}"
+
+
+class _Escritor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+# --- GEOJSON ---
+class EscritorGeoJSON(_Escritor):
+    """Grava uma FeatureCollection em fluxo, uma feição por linha."""
+
+    def __init__(self, caminho, crs, campos=CAMPOS):
+        self._arquivo = open(caminho, 'wb')
+        self._campos = campos
+        self._primeira = True
+        cabecalho = {
+            "type": "FeatureCollection",
+            "name": os.path.splitext(os.path.basename(caminho))[0],
+            "crs": {"type": "name", "properties": {"name": _urn_crs(crs)}},
+        }
+        self._arquivo.write(_dumps(cabecalho)[:-1] + b',\n"features": [\n')
+
+    def _feicao(self, geometria, propriedades):
+        feicao = {
+            "type": "Feature",
+            "properties": {campo: propriedades.get(campo) for campo in self._campos},
+            "geometry": geometria,
+        }
+        if not self._primeira:
+            self._arquivo.write(b',\n')
+        self._primeira = False
+        self._arquivo.write(_dumps(feicao))
+
+    def ponto(self, lon, lat, propriedades):
+        self._feicao({"type": "Point", "coordinates": [lon, lat]}, propriedades)
+
+    def poligono(self, coords, propriedades):
+        self._feicao({"type": "Polygon", "coordinates": [coords]}, propriedades)
+
+    def geometria(self, geometria, propriedades):
+        import shapely
+
+        self._feicao(shapely.geometry.mapping(geometria), propriedades)
+
+    def fechar(self):
+        self._arquivo.write(b'\n]\n}\n')
+        self._arquivo.close()
+
+
+# --- FORMATOS COLUNARES ---
+class _EscritorColunar(_Escritor):
+    """Acumula atributos e vértices em colunas e grava tudo em fechar()."""
+
+    def __init__(self, caminho, crs, campos=CAMPOS):
+        self._caminho = caminho
+        self._crs = crs
+        self._colunas = {campo: [] for campo in campos}
+        self._pontos = []
+        self._aneis = []
+        self._geometrias = []
+        self._tipos = []
+
+    def _atributos(self, propriedades):
+        for campo, valores in self._colunas.items():
+            valores.append(propriedades.get(campo))
+
+    def ponto(self, lon, lat, propriedades):
+        self._atributos(propriedades)
+        self._pontos.append((lon, lat))
+        self._tipos.append(PONTO)
+
+    def poligono(self, coords, propriedades):
+        self._atributos(propriedades)
+        self._aneis.append(coords)
+        self._tipos.append(POLIGONO)
+
+    def geometria(self, geometria, propriedades):
+        self._atributos(propriedades)
+        self._geometrias.append(geometria)
+        self._tipos.append(GEOMETRIA)
+
+    def _geodataframe(self):
+        import geopandas as gpd
+        import shapely
+
+        tipos = np.asarray(self._tipos, dtype=np.int8)
+        geometrias = np.empty(len(tipos), dtype=object)
+        if self._pontos:
+            geometrias[tipos == PONTO] = shapely.points(np.asarray(self._pontos, dtype=float))
+        if self._aneis:
+            tamanhos = [len(anel) for anel in self._aneis]
+            # FlatGeobuf não aceita 2D e 3D misturados; a altitude dos setores é sempre 0
+            coords = np.asarray([c[:2] for anel in self._aneis for c in anel], dtype=float)
+            offsets_aneis = np.concatenate([[0], np.cumsum(tamanhos)])
+            offsets_poligonos = np.arange(len(self._aneis) + 1)
+            geometrias[tipos == POLIGONO] = shapely.from_ragged_array(
+                shapely.GeometryType.POLYGON, coords, (offsets_aneis, offsets_poligonos)
+            )
+        if self._geometrias:
+            geometrias[tipos == GEOMETRIA] = self._geometrias
+        return gpd.GeoDataFrame(self._colunas, geometry=geometrias, crs=self._crs)
+
+
+class EscritorFlatGeobuf(_EscritorColunar):
+    def fechar(self):
+        self._geodataframe().to_file(self._caminho, driver="FlatGeobuf", SPATIAL_INDEX="YES")
+
+
+class EscritorGeoParquet(_EscritorColunar):
+    def fechar(self):
+        self._geodataframe().to_parquet(self._caminho)
+
+
+class EscritorTiles(_EscritorColunar):
+    """Estações, setores e coberturas como camadas de tiles vetoriais, cada uma a partir do seu zoom."""
+
+    def __init__(self, caminho, crs, campos=CAMPOS, formato='pmtiles'):
+        # Os vértices são sempre lon/lat, mesmo quando o perfil rotula outro CRS
+        super().__init__(caminho, "EPSG:4326", campos)
+        self._formato = formato
+
+    def fechar(self):
+        from setores import tiles
+
+        gdf = self._geodataframe()
+        tipos = np.asarray(self._tipos, dtype=np.int8)
+        nome = os.path.splitext(os.path.basename(self._caminho))[0]
+        diretorio = os.path.dirname(os.path.abspath(self._caminho))
+        with tempfile.TemporaryDirectory(dir=diretorio) as temporario:
+            camadas = []
+            for camada, tipo in (('estacoes', PONTO), ('setores', POLIGONO), ('cobertura', GEOMETRIA)):
+                colunas, zoom_minimo = tiles.CAMADAS[camada]
+                parte = gdf.loc[tipos == tipo, [c for c in colunas if c in gdf.columns] + ['geometry']]
+                if len(parte):
+                    camadas.append(os.path.join(temporario, camada + '.mbtiles'))
+                    tiles.gravar_camada(parte, camadas[-1], camada, zoom_minimo)
+            tiles.juntar(self._caminho, self._formato, camadas, nome)
+
+
+class EscritorPMTiles(EscritorTiles):
+    def __init__(self, caminho, crs, campos=CAMPOS):
+        super().__init__(caminho, crs, campos, 'pmtiles')
+
+
+class EscritorMBTiles(EscritorTiles):
+    def __init__(self, caminho, crs, campos=CAMPOS):
+        super().__init__(caminho, crs, campos, 'mbtiles')
+
+
+FORMATOS = {'geojson': EscritorGeoJSON, 'fgb': EscritorFlatGeobuf, 'parquet': EscritorGeoParquet,
+            'pmtiles': EscritorPMTiles, 'mbtiles': EscritorMBTiles}
@@ -0,0 +1,224 @@
+"""Fila de tarefas em segundo plano: id, progresso, cancelamento e coalescência.
+
+Cada envio vira uma tarefa num ProcessPoolExecutor de tamanho fixo, e quem
+enviou guarda só o id. Envios idênticos (mesmo conteúdo e mesmos
+parâmetros) feitos enquanto a primeira tarefa ainda não terminou recebem o
+mesmo id. O processo de trabalho publica o estágio e a entidade em
+andamento num dicionário compartilhado (multiprocessing.Manager). Ali
+também consulta os pedidos de cancelamento, que interrompem a geração no
+próximo ponto de avanço (ver setores.medicao). O resultado fica guardado
+até ser buscado por situacao().
+"""
+import contextlib
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from setores.cache import DIRETORIO_CACHE, CacheDisco, diretorio_privado, diretorio_usuario, hash_arquivo
+
+DIRETORIO_ENTRADAS = os.environ.get("SETORES_ENTRADAS_DIR", diretorio_usuario("setores_entradas"))
+MAX_TAREFAS = int(os.environ.get("SETORES_TAREFAS", max(1, (os.cpu_count() or 1) // 2)))
+# Tarefas terminadas mantidas para consulta; as mais antigas saem primeiro
+MAX_TERMINADAS = 100
+
+NA_FILA = 'na fila'
+RODANDO = 'rodando'
+CONCLUIDA = 'concluída'
+CANCELADA = 'cancelada'
+ERRO = 'erro'
+ATIVAS = (NA_FILA, RODANDO)
+
+
+class TarefaCancelada(Exception):
+    """Interrompe, no processo de trabalho, uma tarefa cancelada."""
+
+
+class Tarefa:
+    """Estado de uma tarefa no processo que a enviou."""
+
+    def __init__(self, id_tarefa, chave, entrada, future, sessao=None):
+        self.id = id_tarefa
+        self.chave = chave
+        self.entrada = entrada
+        self.future = future
+        self.estado = NA_FILA
+        # Sessões que aguardam a tarefa; repetir o envio na mesma sessão não conta de novo
+        self.interessados = {sessao}
+        self.resultado = None
+        self.erro = None
+        self.enviada = time.time()
+        self.terminada = None
+
+    @property
+    def ativa(self):
+        return self.estado in ATIVAS
+
+
+def _executar(id_tarefa, entrada, parametros, diretorio_cache, memoria, progresso, cancelamentos):
+    """Roda no processo de trabalho; devolve (kmz, feições, relatório da medição)."""
+    from setores.medicao import Medicao
+    from setores.motor import processar_arquivo
+
+    def ao_avancar(estagio, feito, total, detalhe):
+        if id_tarefa in cancelamentos:
+            raise TarefaCancelada(id_tarefa)
+        progresso[id_tarefa] = {'estagio': estagio, 'feito': feito, 'total': total, 'detalhe': detalhe}
+
+    ao_avancar('início', 0, None, None)
+    cache = CacheDisco(diretorio_cache)
+    with Medicao(memoria=memoria, ao_avancar=ao_avancar) as medicao:
+        kmz, feicoes = processar_arquivo(entrada, cache=cache, medicao=medicao, **parametros)
+    return kmz, feicoes, medicao.relatorio()
+
+
+class FilaTarefas:
+    """Até max_tarefas gerações simultâneas, compartilhadas entre as sessões do app.
+
+    parametros de enviar() são os argumentos nomeados de processar_arquivo;
+    as saídas ficam no cache em disco, que também serve as repetições.
+    """
+
+    def __init__(self, max_tarefas=MAX_TAREFAS, diretorio_cache=DIRETORIO_CACHE,
+                 diretorio_entradas=DIRETORIO_ENTRADAS):
+        self.max_tarefas = max_tarefas
+        self.diretorio_cache = diretorio_cache
+        self.diretorio_entradas = diretorio_entradas
+        # spawn: o app roda em várias threads, e fork de um processo com threads pode travar
+        self._contexto = multiprocessing.get_context('spawn')
+        self._gerente = self._contexto.Manager()
+        self._progresso = self._gerente.dict()
+        self._cancelamentos = self._gerente.dict()
+        self._pool = None
+        self._tarefas = {}
+        self._ativas_por_chave = {}
+        self._trava = threading.RLock()
+
+    def _salvar_entrada(self, arquivo, hash_entrada):
+        """Caminho em disco da entrada; objetos de arquivo são copiados pelo hash."""
+        if not hasattr(arquivo, 'read'):
+            return arquivo
+        extensao = os.path.splitext(getattr(arquivo, 'name', ''))[1].lower()
+        caminho = os.path.join(diretorio_privado(self.diretorio_entradas), hash_entrada + extensao)
+        # Uma cópia existente só é reaproveitada se o conteúdo ainda bate com o hash
+        if not os.path.isfile(caminho) or hash_arquivo(caminho) != hash_entrada:
+            temporario = caminho + f".{uuid.uuid4().hex}.tmp"
+            arquivo.seek(0)
+            with open(temporario, 'wb') as f:
+                shutil.copyfileobj(arquivo, f)
+            arquivo.seek(0)
+            os.replace(temporario, caminho)
+        return caminho
+
+    def _submeter(self, *argumentos):
+        for _ in range(2):
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_tarefas, mp_context=self._contexto)
+            try:
+                return self._pool.submit(_executar, *argumentos)
+            except BrokenProcessPool:
+                # Um processo de trabalho morreu (ex.: falta de memória): recomeça com um pool novo
+                self._pool = None
+        raise BrokenProcessPool("Não foi possível iniciar os processos de trabalho.")
+
+    def enviar(self, arquivo, parametros, memoria=False, sessao=None):
+        """Id da tarefa que gera as saídas de arquivo (caminho ou objeto de arquivo).
+
+        sessao identifica quem aguarda a tarefa (ver cancelar()).
+        """
+        hash_entrada = hash_arquivo(arquivo)
+        chave = CacheDisco.chave(hash_entrada, sorted(parametros.items()), memoria)
+        with self._trava:
+            id_tarefa = self._ativas_por_chave.get(chave)
+            if id_tarefa is not None:
+                self._tarefas[id_tarefa].interessados.add(sessao)
+                return id_tarefa
+            entrada = self._salvar_entrada(arquivo, hash_entrada)
+            id_tarefa = uuid.uuid4().hex[:12]
+            future = self._submeter(id_tarefa, entrada, parametros, self.diretorio_cache, memoria,
+                                    self._progresso, self._cancelamentos)
+            self._tarefas[id_tarefa] = Tarefa(id_tarefa, chave, entrada, future, sessao)
+            self._ativas_por_chave[chave] = id_tarefa
+            self._podar()
+        future.add_done_callback(partial(self._terminar, id_tarefa))
+        return id_tarefa
+
+    def _terminar(self, id_tarefa, future):
+        with self._trava:
+            tarefa = self._tarefas[id_tarefa]
+            if future.cancelled():
+                tarefa.estado = CANCELADA
+            elif isinstance(future.exception(), TarefaCancelada):
+                tarefa.estado = CANCELADA
+            elif future.exception() is not None:
+                tarefa.estado = ERRO
+                tarefa.erro = str(future.exception())
+            else:
+                tarefa.estado = CONCLUIDA
+                tarefa.resultado = future.result()
+            tarefa.terminada = time.time()
+            tarefa.future = None
+            if self._ativas_por_chave.get(tarefa.chave) == id_tarefa:
+                del self._ativas_por_chave[tarefa.chave]
+            # Gerente já encerrado (fechar()) ou tarefa que nunca chegou a rodar
+            with contextlib.suppress(KeyError, OSError, EOFError):
+                self._progresso.pop(id_tarefa, None)
+                self._cancelamentos.pop(id_tarefa, None)
+            self._remover_entrada(tarefa)
+
+    def _remover_entrada(self, tarefa):
+        if not tarefa.entrada.startswith(self.diretorio_entradas):
+            return
+        if any(t.entrada == tarefa.entrada and t.ativa for t in self._tarefas.values()):
+            return
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tarefa.entrada)
+
+    def _podar(self):
+        terminadas = [t for t in self._tarefas.values() if not t.ativa]
+        for tarefa in sorted(terminadas, key=lambda t: t.terminada)[:max(0, len(terminadas) - MAX_TERMINADAS)]:
+            del self._tarefas[tarefa.id]
+
+    def situacao(self, id_tarefa):
+        """Estado, progresso, posição na fila e resultado da tarefa; None se desconhecida."""
+        with self._trava:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None:
+                return None
+            situacao = {'id': id_tarefa, 'estado': tarefa.estado, 'erro': tarefa.erro,
+                        'resultado': tarefa.resultado, 'estagio': None, 'feito': None, 'total': None,
+                        'detalhe': None, 'posicao': None}
+            if tarefa.ativa:
+                progresso = self._progresso.get(id_tarefa)
+                if progresso is not None:
+                    situacao.update(progresso, estado=RODANDO)
+                else:
+                    na_fila = [t.enviada for t in self._tarefas.values()
+                               if t.ativa and t.id not in self._progresso]
+                    situacao['posicao'] = sum(enviada <= tarefa.enviada for enviada in na_fila)
+            return situacao
+
+    def cancelar(self, id_tarefa, sessao=None):
+        """A sessão desiste da tarefa; ela só para quando nenhuma sessão a aguarda mais."""
+        with self._trava:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None or not tarefa.ativa:
+                return
+            tarefa.interessados.discard(sessao)
+            if tarefa.interessados:
+                return
+            if self._ativas_por_chave.get(tarefa.chave) == id_tarefa:
+                # Um envio igual daqui em diante começa uma tarefa nova
+                del self._ativas_por_chave[tarefa.chave]
+            if not tarefa.future.cancel():
+                self._cancelamentos[id_tarefa] = True
+
+    def fechar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._gerente.shutdown()
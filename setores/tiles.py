@@ -0,0 +1,255 @@
+"""Tiles vetoriais (PMTiles ou MBTiles) das estações e setores para mapas web.
+
+O GDAL (via pyogrio) gera os tiles Mapbox Vector Tile de cada camada: a
+geometria é simplificada por zoom e, quando um tile passa de
+TAMANHO_MAXIMO_TILE, as feições perdem precisão ou são descartadas. Cada
+gravação do pyogrio cria uma só camada, então estações, setores e, se
+houver, coberturas vão para MBTiles temporários, cada um com a sua faixa
+de zoom. Um tile MVT é uma lista de camadas, e concatenar dois protobufs
+de tile dá um tile com as duas; assim os tiles são juntados num só
+arquivo. O PMTiles é lido por requisições de intervalo HTTP, sem servidor
+de tiles.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+
+ZOOM_MINIMO = 4
+ZOOM_MAXIMO = 14
+# Abaixo disso um setor de 1,5 km ocupa poucos pixels: só as estações aparecem
+ZOOM_MINIMO_SETORES = 10
+# Tolerância de simplificação em unidades do tile (extensão 4096), abaixo do zoom máximo e nele
+SIMPLIFICACAO = 2
+SIMPLIFICACAO_ZOOM_MAXIMO = 0.5
+TAMANHO_MAXIMO_TILE = 500_000
+# Camada → (colunas, zoom mínimo); as outras colunas das feições não vão para os tiles
+CAMADAS = {
+    'estacoes': (['NomeEntidade', 'NumEstacao', 'FreqTxMHz'], ZOOM_MINIMO),
+    'setores': (['NomeEntidade', 'NumEstacao', 'FreqTxMHz', 'Azimute', 'Tecnologia'], ZOOM_MINIMO_SETORES),
+    'cobertura': (['NomeEntidade', 'Faixa', 'Setores'], ZOOM_MINIMO),
+}
+
+CABECALHO_PMTILES = struct.Struct('<7sB11Q6B4iB2i')
+TAMANHO_RAIZ_PMTILES = 16384 - CABECALHO_PMTILES.size
+FOLHA_INICIAL_PMTILES = 4096
+COMPRESSAO_GZIP = 2
+TIPO_MVT = 1
+
+
+def gravar_camada(gdf, caminho, camada, zoom_minimo, zoom_maximo=ZOOM_MAXIMO):
+    """Grava gdf (EPSG:4326) como um MBTiles vetorial de uma camada."""
+    import pyogrio
+
+    pyogrio.write_dataframe(gdf, caminho, layer=camada, driver='MBTiles', dataset_options={
+        'MINZOOM': zoom_minimo,
+        'MAXZOOM': zoom_maximo,
+        'SIMPLIFICATION': SIMPLIFICACAO,
+        'SIMPLIFICATION_MAX_ZOOM': SIMPLIFICACAO_ZOOM_MAXIMO,
+        'MAX_SIZE': TAMANHO_MAXIMO_TILE,
+    })
+
+
+# --- JUNÇÃO ---
+def id_tile(z, x, y):
+    """Id do tile no PMTiles: tiles dos zooms anteriores mais a posição na curva de Hilbert."""
+    acumulado = ((1 << (2 * z)) - 1) // 3
+    d = 0
+    s = 1 << z >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = s - 1 - x, s - 1 - y
+            x, y = y, x
+        s >>= 1
+    return acumulado + d
+
+
+def _metadados_mbtiles(conexao, esquema):
+    return dict(conexao.execute(f"SELECT name, value FROM {esquema}.metadata"))
+
+
+def _juntar_metadados(nome, metadados):
+    """Metadados do arquivo juntado; sem camadas (nenhuma linha), limites e zooms padrão."""
+    camadas = []
+    for m in metadados:
+        camadas.extend(json.loads(m.get('json', '{}')).get('vector_layers', []))
+    limites = [[float(v) for v in m['bounds'].split(',')] for m in metadados if m.get('bounds')]
+    limites = [min(l[0] for l in limites), min(l[1] for l in limites),
+               max(l[2] for l in limites), max(l[3] for l in limites)] if limites else [-180, -85, 180, 85]
+    return {
+        'name': nome,
+        'format': 'pbf',
+        'type': 'overlay',
+        'minzoom': min((int(m['minzoom']) for m in metadados), default=ZOOM_MINIMO),
+        'maxzoom': max((int(m['maxzoom']) for m in metadados), default=ZOOM_MAXIMO),
+        'bounds': limites,
+        'center': [(limites[0] + limites[2]) / 2, (limites[1] + limites[3]) / 2, ZOOM_MINIMO],
+        'vector_layers': camadas,
+    }
+
+
+def _tiles_juntos(conexao, esquemas, ordem):
+    """(z, x, y XYZ, tile gzip) com as camadas de todos os esquemas, em ordem."""
+    if not esquemas:
+        return
+    uniao = " UNION ALL ".join(
+        f"SELECT zoom_level AS z, tile_column AS x, (1 << zoom_level) - 1 - tile_row AS y, tile_data "
+        f"FROM {esquema}.tiles" for esquema in esquemas
+    )
+    atual, partes = None, []
+    for z, x, y, dados in conexao.execute(f"SELECT z, x, y, tile_data FROM ({uniao}) ORDER BY {ordem}"):
+        if (z, x, y) != atual:
+            if partes:
+                yield (*atual, _juntar_tile(partes))
+            atual, partes = (z, x, y), []
+        partes.append(dados)
+    if partes:
+        yield (*atual, _juntar_tile(partes))
+
+
+def _juntar_tile(partes):
+    if len(partes) == 1:
+        return partes[0]
+    return gzip.compress(b''.join(gzip.decompress(parte) for parte in partes), mtime=0)
+
+
+def juntar(caminho, formato, camadas, nome):
+    """Junta os MBTiles de uma camada cada em caminho ('pmtiles' ou 'mbtiles')."""
+    conexao = sqlite3.connect(':memory:')
+    esquemas = []
+    for i, origem in enumerate(camadas):
+        esquemas.append(f"c{i}")
+        conexao.execute(f"ATTACH DATABASE ? AS c{i}", (origem,))
+    metadados = _juntar_metadados(nome, [_metadados_mbtiles(conexao, esquema) for esquema in esquemas])
+    if formato == 'pmtiles':
+        conexao.create_function('id_tile', 3, id_tile, deterministic=True)
+        _gravar_pmtiles(caminho, _tiles_juntos(conexao, esquemas, 'id_tile(z, x, y)'), metadados)
+    else:
+        _gravar_mbtiles(caminho, _tiles_juntos(conexao, esquemas, 'z, x, y'), metadados)
+    conexao.close()
+    return caminho
+
+
+# --- MBTILES ---
+def _gravar_mbtiles(caminho, tiles, metadados):
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    conexao = sqlite3.connect(caminho)
+    conexao.executescript(
+        "CREATE TABLE metadata (name TEXT, value TEXT);"
+        "CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);"
+    )
+    valores = {chave: valor for chave, valor in metadados.items() if chave != 'vector_layers'}
+    valores['bounds'] = ','.join(map(str, valores['bounds']))
+    valores['center'] = ','.join(map(str, valores['center']))
+    valores['json'] = json.dumps({'vector_layers': metadados['vector_layers']})
+    conexao.executemany("INSERT INTO metadata VALUES (?, ?)", [(k, str(v)) for k, v in valores.items()])
+    conexao.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                        ((z, x, (1 << z) - 1 - y, dados) for z, x, y, dados in tiles))
+    conexao.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+    conexao.commit()
+    conexao.close()
+
+
+# --- PMTILES ---
+def _varint(valor, saida):
+    while valor >= 0x80:
+        saida.append((valor & 0x7f) | 0x80)
+        valor >>= 7
+    saida.append(valor)
+
+
+def _diretorio(entradas):
+    """Diretório PMTiles v3 (comprimido) de (id, deslocamento, tamanho, repetições)."""
+    saida = bytearray()
+    _varint(len(entradas), saida)
+    anterior = 0
+    for id_atual, _, _, _ in entradas:
+        _varint(id_atual - anterior, saida)
+        anterior = id_atual
+    for _, _, _, repeticoes in entradas:
+        _varint(repeticoes, saida)
+    for _, _, tamanho, _ in entradas:
+        _varint(tamanho, saida)
+    fim_anterior = None
+    for deslocamento, tamanho in ((e[1], e[2]) for e in entradas):
+        # 0 marca um tile logo após o anterior
+        _varint(0 if deslocamento == fim_anterior else deslocamento + 1, saida)
+        fim_anterior = deslocamento + tamanho
+    return gzip.compress(bytes(saida), mtime=0)
+
+
+def _diretorios(entradas):
+    """Raiz e folhas: com muitos tiles, a raiz aponta para diretórios-folha."""
+    raiz = _diretorio(entradas)
+    tamanho_folha = FOLHA_INICIAL_PMTILES
+    while len(raiz) > TAMANHO_RAIZ_PMTILES:
+        folhas = bytearray()
+        entradas_raiz = []
+        for inicio in range(0, len(entradas), tamanho_folha):
+            folha = _diretorio(entradas[inicio:inicio + tamanho_folha])
+            entradas_raiz.append((entradas[inicio][0], len(folhas), len(folha), 0))
+            folhas += folha
+        raiz = _diretorio(entradas_raiz)
+        tamanho_folha *= 2
+        if len(raiz) <= TAMANHO_RAIZ_PMTILES:
+            return raiz, bytes(folhas)
+    return raiz, b''
+
+
+def _gravar_pmtiles(caminho, tiles, metadados):
+    """Grava um PMTiles v3; tiles vem em ordem de id_tile."""
+    entradas = []
+    # Tiles repetidos (ex.: oceano) são gravados uma vez; guarda só o digest e o deslocamento
+    conteudos = {}
+    zooms = set()
+    with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(caminho))) as dados_tiles:
+        tamanho_dados = 0
+        for z, x, y, dados in tiles:
+            zooms.add(z)
+            id_atual = id_tile(z, x, y)
+            digest = hashlib.sha256(dados).digest()
+            deslocamento = conteudos.get(digest)
+            if deslocamento is None:
+                deslocamento = conteudos[digest] = tamanho_dados
+                dados_tiles.write(dados)
+                tamanho_dados += len(dados)
+            anterior = entradas[-1] if entradas else None
+            if (anterior and anterior[1] == deslocamento
+                    and anterior[0] + anterior[3] == id_atual):
+                entradas[-1] = (anterior[0], anterior[1], anterior[2], anterior[3] + 1)
+            else:
+                entradas.append((id_atual, deslocamento, len(dados), 1))
+        raiz, folhas = _diretorios(entradas)
+        meta = gzip.compress(json.dumps(metadados).encode('utf-8'), mtime=0)
+        oeste, sul, leste, norte = metadados['bounds']
+        centro_lon, centro_lat, centro_zoom = metadados['center']
+        deslocamento_raiz = CABECALHO_PMTILES.size
+        deslocamento_meta = deslocamento_raiz + len(raiz)
+        deslocamento_folhas = deslocamento_meta + len(meta)
+        deslocamento_dados = deslocamento_folhas + len(folhas)
+        cabecalho = CABECALHO_PMTILES.pack(
+            b'PMTiles', 3,
+            deslocamento_raiz, len(raiz), deslocamento_meta, len(meta), deslocamento_folhas, len(folhas),
+            deslocamento_dados, tamanho_dados,
+            sum(e[3] for e in entradas), len(entradas), len(conteudos),
+            1, COMPRESSAO_GZIP, COMPRESSAO_GZIP, TIPO_MVT, min(zooms, default=metadados['minzoom']),
+            max(zooms, default=metadados['maxzoom']),
+            round(oeste * 1e7), round(sul * 1e7), round(leste * 1e7), round(norte * 1e7),
+            centro_zoom, round(centro_lon * 1e7), round(centro_lat * 1e7),
+        )
+        with open(caminho, 'wb') as f:
+            f.write(cabecalho)
+            f.write(raiz)
+            f.write(meta)
+            f.write(folhas)
+            dados_tiles.seek(0)
+            shutil.copyfileobj(dados_tiles, f)
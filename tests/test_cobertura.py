@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from setores.cobertura import dissolver
+from setores.geometria import calcular_setores
+
+
+def _estacoes(n=200):
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-23.6, -23.4, n)
+    lon = rng.uniform(-46.7, -46.5, n)
+    azimute = rng.choice([0, 120, 240], n)
+    entidades = np.array(['A', 'B'])[rng.integers(0, 2, n)]
+    faixas = np.array([700, 1800])[rng.integers(0, 2, n)]
+    return lat, lon, azimute, entidades, faixas
+
+
+@pytest.mark.parametrize('angulo', [30, 90, 180])
+def test_dissolver_angulos(angulo):
+    lat, lon, azimute, entidades, faixas = _estacoes()
+    cobertura = dissolver(entidades, faixas, calcular_setores(lat, lon, azimute, 1.5, angulo))
+    assert len(cobertura) <= 4
+    assert all(g.geom_type == 'MultiPolygon' and g.area > 0 for g in cobertura['geometria'])
+
+
+def test_dissolver_vazio():
+    assert dissolver([], [], np.empty((0, 4, 2))).empty
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from setores.incremental import comparar
+
+
+def _estado(linhas):
+    return pd.DataFrame(linhas, columns=['NomeEntidade', 'NumEstacao', 'Latitude', 'Longitude', 'Impressao',
+                                         'Particao']).astype({'Impressao': 'uint64'})
+
+
+def test_comparar():
+    anteriores = _estado([
+        ('CLARO', '1', -23.5, -46.6, 10, 'SP'),
+        ('CLARO', '2', -23.6, -46.7, 20, 'SP'),
+        ('VIVO', '3', -22.9, -43.2, 30, 'RJ'),
+        ('TIM', '4', -22.8, -43.1, 40, 'RJ'),
+    ])
+    atuais = _estado([
+        ('CLARO', '1', -23.5, -46.6, 10, 'SP'),
+        ('CLARO', '2', -23.6, -46.7, 21, 'SP'),
+        ('VIVO', '3', -22.9, -43.2, 30, 'MG'),
+        ('OI', '5', -19.9, -43.9, 50, 'MG'),
+    ])
+    mudancas = comparar(anteriores, atuais).set_index('NumEstacao')
+    assert mudancas['Mudanca'].to_dict() == {'2': 'alterada', '3': 'alterada', '4': 'removida', '5': 'adicionada'}
+    assert mudancas.loc['3', ['Particao_anterior', 'Particao_atual']].tolist() == ['RJ', 'MG']
+    assert mudancas.loc['4', 'Latitude'] == -22.8
+
+
+def test_comparar_sem_mudancas():
+    estado = _estado([('CLARO', '1', -23.5, -46.6, 10, 'SP')])
+    assert comparar(estado, estado.copy()).empty
+    assert (comparar(estado.iloc[:0], estado)['Mudanca'] == 'adicionada').all()
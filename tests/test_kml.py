@@ -0,0 +1,66 @@
+import os
+import zipfile
+import zlib
+
+import numpy as np
+import pytest
+import simplekml
+
+from setores import kml
+from setores.kml import EscritorZip, KmzContinuo, aplicar_estilos, crc32_concatenado
+
+CORES = ['ff0000ff', 'ff00ff00', 'ffff0000']
+DOCUMENTOS = ['doc.kml', 'files/q0.kml']
+
+
+def _escrever(caminho, alpha, n=3000):
+    """KMZ com dois documentos contínuos, como o regionado; devolve as peças."""
+    rng = np.random.default_rng(0)
+    pecas = []
+    with EscritorZip(caminho) as kmz:
+        for arquivo in DOCUMENTOS:
+            with KmzContinuo(caminho, "Teste", kmz=kmz, arquivo=arquivo) as documento:
+                pasta = documento.newfolder("Pasta")
+                for i in range(n):
+                    lon, lat = rng.uniform(-50, -40), rng.uniform(-25, -15)
+                    cor = simplekml.Color.changealphaint(alpha, CORES[i % len(CORES)])
+                    pasta.poligono(f"Setor {i}", "descrição", [(lon, lat, 0), (lon + 0.01, lat, 0),
+                                                               (lon, lat + 0.01, 0)], cor, 1.0)
+            pecas.append(documento.peca)
+    return pecas
+
+
+def _conteudo(caminho):
+    with zipfile.ZipFile(caminho) as kmz:
+        assert kmz.testzip() is None
+        return {nome: kmz.read(nome) for nome in kmz.namelist()}
+
+
+@pytest.mark.parametrize('tamanho_a, tamanho_b', [(0, 0), (1, 0), (0, 7), (100, 1), (1000, 65537)])
+def test_crc32_concatenado(tamanho_a, tamanho_b):
+    a, b = os.urandom(tamanho_a), os.urandom(tamanho_b)
+    assert crc32_concatenado(zlib.crc32(a), zlib.crc32(b), len(b)) == zlib.crc32(a + b)
+
+
+def test_aplicar_estilos(tmp_path):
+    base, destino, nova = tmp_path / 'base.kmz', tmp_path / 'destino.kmz', tmp_path / 'nova.kmz'
+    pecas = _escrever(base, 153)
+    aplicar_estilos(base, destino, pecas, 64)
+    _escrever(nova, 64)
+    conteudo = _conteudo(destino)
+    assert list(conteudo) == DOCUMENTOS
+    assert conteudo == _conteudo(nova)
+    assert conteudo != _conteudo(base)
+
+
+def test_zip64(tmp_path, monkeypatch):
+    # Com o limite em zero, toda entrada e o diretório central vão pelo caminho ZIP64
+    monkeypatch.setattr(kml, 'LIMITE_ZIP32', 0)
+    base, destino, nova = tmp_path / 'base.kmz', tmp_path / 'destino.kmz', tmp_path / 'nova.kmz'
+    pecas = _escrever(base, 153, n=50)
+    aplicar_estilos(base, destino, pecas, 64)
+    _escrever(nova, 64, n=50)
+    assert _conteudo(destino) == _conteudo(nova)
+    with zipfile.ZipFile(destino) as kmz:
+        assert all(info.extra[:2] == b'\x01\x00' for info in kmz.infolist())
+    assert b'PK\x06\x06' in destino.read_bytes()